@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, nullcontext
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern, URLResolver
+
+SLOT_POLL_INTERVAL = 0.005
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class StreamThreadsBusy(Exception):
+    """raised when no stream thread frees up in time, so the response can be shed with a 503"""
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.ASYNC_DB_WORKERS, thread_name_prefix='async-db')
+    return _executor
+
+
+def database_sync_to_async(function):
+    """
+    sync_to_async running on the bounded pool of database threads instead of the single thread
+    django 3.2 runs every sync view of an ASGI worker on, so requests query concurrently. pool
+    threads keep their own connections, which are recycled like those of request threads
+    """
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    @wraps(function)
+    async def wrapper(*args, **kwargs):
+        if not settings.ASYNC_DB_WORKERS:
+            return await sync_to_async(function, thread_sensitive=True)(*args, **kwargs)
+        return await sync_to_async(run, thread_sensitive=False, executor=_get_executor())(*args, **kwargs)
+    return wrapper
+
+
+class StreamThreads:
+    """
+    bounded set of threads reading streamed bodies, ASYNC_DB_STREAM_WORKERS per process. a body is
+    read on one thread for its whole transfer, so a server side cursor stays on the connection it
+    was opened on, and so at most that many connections are held by slow clients at once
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots = None
+        self._idle = []
+
+    @asynccontextmanager
+    async def reserve(self):
+        """a single thread executor to read one body on, waiting in the event loop while all are busy"""
+        with self._lock:
+            if self._slots is None:
+                self._slots = threading.BoundedSemaphore(settings.ASYNC_DB_STREAM_WORKERS)
+        deadline = time.monotonic() + settings.ASYNC_DB_STREAM_QUEUE_TIMEOUT
+        while not self._slots.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                raise StreamThreadsBusy('all stream threads are busy')
+            await asyncio.sleep(SLOT_POLL_INTERVAL)
+        with self._lock:
+            executor = self._idle.pop() if self._idle else ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='async-db-stream'
+            )
+        try:
+            yield executor
+        finally:
+            with self._lock:
+                self._idle.append(executor)
+            self._slots.release()
+
+
+stream_threads = StreamThreads()
+
+
+async def database_iterate(iterable, executor=None):
+    """
+    async iterator over a sync iterable that reads the database, such as a streamed response body.
+    every step runs on executor, a thread of stream_threads, and nothing holds it while the client
+    reads. without one, on django's thread sensitive thread
+    """
+    iterator = iter(iterable)
+    if executor is None:
+        step = sync_to_async(partial(next, iterator, None), thread_sensitive=True)
+    else:
+        await sync_to_async(close_old_connections, thread_sensitive=False, executor=executor)()
+        step = sync_to_async(partial(next, iterator, None), thread_sensitive=False, executor=executor)
+    try:
+        while True:
+            item = await step()
+            if item is None:
+                return
+            yield item
+    finally:
+        if executor is not None:
+            # the connection is kept for the next body as long as CONN_MAX_AGE allows
+            await sync_to_async(close_old_connections, thread_sensitive=False, executor=executor)()
+
+
+def async_view(view):
+    """
+    async variant of a DRF view for ASGI workers. the token is checked against the in-process
+    cache in the event loop, everything else (authentication on a miss, queries, rendering) runs
+    in a single hop onto the database pool, so waiting on slow clients never holds a thread.
+    views can do work that is better awaited in the event loop in a prepare_async(request) async
+    context manager, the sync view runs inside it
+    """
+    authenticators = [authentication() for authentication in view.cls.authentication_classes]
+    if not all(hasattr(authenticator, 'authenticate_in_process') for authenticator in authenticators):
+        authenticators = []
+    prepare = getattr(view.cls, 'prepare_async', None)
+
+    @database_sync_to_async
+    def respond(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        # streamed bodies are read by recipe_app_api.asgi.AsyncViewsASGIHandler, see database_iterate
+        if not response.streaming and hasattr(response, 'render'):
+            response.render()
+        return response
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        for authenticator in authenticators:
+            credentials = authenticator.authenticate_in_process(request)
+            if credentials is not None:
+                # picked up by DRF's Request instead of running its authenticators again
+                request._force_auth_user, request._force_auth_token = credentials
+                break
+        async with prepare(request) if prepare is not None else nullcontext():
+            return await respond(request, *args, **kwargs)
+    return wrapper
+
+
+def async_patterns(patterns, view_classes):
+    """the url patterns with the views of view_classes (and their subclasses) replaced by async_view"""
+    async_urlpatterns = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            pattern = URLResolver(
+                pattern.pattern, async_patterns(pattern.url_patterns, view_classes),
+                pattern.default_kwargs, pattern.app_name, pattern.namespace,
+            )
+        elif issubclass(getattr(pattern.callback, 'cls', object), view_classes):
+            pattern = URLPattern(pattern.pattern, async_view(pattern.callback), pattern.default_args, pattern.name)
+        async_urlpatterns.append(pattern)
+    return async_urlpatterns
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# caches that aren't shared between processes, where a pin set by one worker is missed by the others
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_replica_pin_cache(app_configs, **kwargs):
+    """read-your-writes with replicas needs the pins to the primary in a cache every worker sees"""
+    if not settings.DATABASE_REPLICAS:
+        return []
+    backend = settings.CACHES[settings.REPLICA_PIN_CACHE_ALIAS]['BACKEND']
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        f'REPLICA_PIN_CACHE_ALIAS {settings.REPLICA_PIN_CACHE_ALIAS!r} uses {backend}, which isn\'t shared '
+        f'between workers, so a user\'s write on one worker doesn\'t keep their reads on another off the replicas.',
+        hint='Point CACHE_BACKEND/CACHE_LOCATION at a shared cache such as redis.',
+        id='core.E001',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def check_recipe_cache(app_configs, **kwargs):
+    """the generations behind cached lists and etags have to change for every worker on a write"""
+    backend = settings.CACHES[settings.RECIPE_CACHE_ALIAS]['BACKEND']
+    # a dummy cache starts a new generation on every read, which is never stale
+    if backend != 'django.core.cache.backends.locmem.LocMemCache':
+        return []
+    return [Error(
+        f'RECIPE_CACHE_ALIAS {settings.RECIPE_CACHE_ALIAS!r} uses {backend}, which isn\'t shared between '
+        f'workers, so after a write on one worker the others keep serving cached lists and 304s for old etags.',
+        hint='Point CACHE_BACKEND/CACHE_LOCATION at a shared cache such as redis, or silence core.E002 when '
+             'a single process serves the app.',
+        id='core.E002',
+    )]
@@ -0,0 +1,34 @@
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+    """
+    postgres with the CONN_HEALTH_CHECKS setting of django 4.1 backported: a persistent connection
+    is checked once per request, before its first query, and replaced when the server (or a
+    pooler) dropped it, instead of failing that query
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    def connect(self):
+        super().connect()
+        # a new connection is known to work
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        # called at the start and end of every request
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        if self.connection is None or self.health_check_done or not self.settings_dict.get('CONN_HEALTH_CHECKS'):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
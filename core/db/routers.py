@@ -0,0 +1,169 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import SimpleLazyObject
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# credentials and sessions are always read from the primary, so a new token or password works at once
+PRIMARY_ONLY_MODELS = (
+    'authtoken.token', 'authtoken.tokenproxy', 'sessions.session', settings.AUTH_USER_MODEL.lower(),
+)
+PIN_KEY = 'db-pinned-to-primary:{user_id}'
+
+_routing = ContextVar('replica_routing', default=None)
+_primary_only = ContextVar('replica_routing_primary_only', default=False)
+
+
+def _user_id(request):
+    """the id of the user the request is authenticated as so far, without evaluating django's lazy session user"""
+    user = request.__dict__.get('user')
+    if user is None or isinstance(user, SimpleLazyObject) or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+class RequestRouting:
+    """where the reads of one request go: the primary for writes and users who just wrote, else one replica"""
+
+    def __init__(self, request):
+        self.request = request
+        self.replica = random.choice(settings.DATABASE_REPLICAS) if settings.DATABASE_REPLICAS else None
+        self.pinned = None
+        self.wrote = False
+        self.pin_saved = False
+        self.replica_read = False
+
+    def db_for_read(self):
+        if self.replica is None or self.wrote or self.request.method not in SAFE_METHODS or _primary_only.get():
+            return DEFAULT_DB_ALIAS
+        if self.pinned is None:
+            user_id = _user_id(self.request)
+            if user_id is not None:
+                self.pinned = bool(caches[settings.REPLICA_PIN_CACHE_ALIAS].get(PIN_KEY.format(user_id=user_id)))
+        if self.pinned:
+            return DEFAULT_DB_ALIAS
+        # also before token authentication has run
+        self.replica_read = True
+        return self.replica
+
+    def db_for_write(self):
+        self.wrote = True
+        if not self.pin_saved:
+            user_id = _user_id(self.request)
+            if user_id is not None:
+                self.pin_saved = True
+                caches[settings.REPLICA_PIN_CACHE_ALIAS].set(
+                    PIN_KEY.format(user_id=user_id), True, settings.REPLICA_PIN_SECONDS
+                )
+        return DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def reads_from_primary():
+    """route the reads of the block to the primary, for results that are kept beyond the request"""
+    token = _primary_only.set(True)
+    try:
+        yield
+    finally:
+        _primary_only.reset(token)
+
+
+def read_from_replica(streaming=False):
+    """
+    whether the current request has read from a replica, which may lag behind the primary. with
+    streaming, also whether it will, for the reads of a body that isn't produced yet
+    """
+    routing = _routing.get()
+    if routing is None:
+        return False
+    return routing.replica_read or streaming and routing.db_for_read() != DEFAULT_DB_ALIAS
+
+
+class PrimaryReplicaRouter:
+    """
+    sends the reads of GET/HEAD/OPTIONS requests to one of settings.DATABASE_REPLICAS and everything
+    else to the primary. a user's reads stay on the primary for REPLICA_PIN_SECONDS after their last
+    write, so they don't miss what they just saved while the replicas catch up. queries outside of a
+    request (commands, migrations) always go to the primary
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        routing = _routing.get()
+        return routing.db_for_read() if routing is not None else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        return routing.db_for_write() if routing is not None else DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaRoutingMiddleware:
+    """lets PrimaryReplicaRouter route the queries of the request, in sync and async handlers alike"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = RequestRouting(request)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.route_streaming(routing, response)
+
+    async def __acall__(self, request):
+        # sync_to_async copies the context, so views and the database pool see the routing too
+        routing = RequestRouting(request)
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.route_streaming(routing, response)
+
+    @staticmethod
+    def route_streaming(routing, response):
+        """streamed bodies are read after the response left the middleware, route their queries too"""
+        if response.streaming:
+            response.streaming_content = _routed(routing, response.streaming_content)
+        return response
+
+
+def _routed(routing, iterable):
+    iterator = iter(iterable)
+    while True:
+        # set for each chunk, which may be read in another context than the previous one
+        token = _routing.set(routing)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _routing.reset(token)
+        yield chunk
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher as BaseArgon2PasswordHasher, identify_hasher
+
+# seconds between checks for a free hashing slot from the event loop, which can't block on the semaphore
+SLOT_POLL_INTERVAL = 0.005
+
+_prehashed = ContextVar('prehashed_passwords', default=None)
+
+
+class PasswordHashingBusy(Exception):
+    """raised when no hashing slot frees up in time, so callers can shed load"""
+
+
+class HashingPool:
+    """
+    bounded pool of threads running password hashes. argon2 releases the GIL, so hashes
+    run in parallel while at most `workers + queue size` requests wait for one. sync callers
+    (every WSGI request) still wait on their thread, the pool caps concurrency and sheds load.
+    async views under ASGI await it in the event loop instead, see prehash
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def _setup(self):
+        with self._lock:
+            if self._executor is None:
+                workers = settings.PASSWORD_HASHING_WORKERS or os.cpu_count() or 1
+                self._slots = threading.BoundedSemaphore(workers + settings.PASSWORD_HASHING_QUEUE_SIZE)
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+
+    def run(self, func, *args):
+        if self._executor is None:
+            self._setup()
+        if not self._slots.acquire(timeout=settings.PASSWORD_HASHING_QUEUE_TIMEOUT):
+            raise PasswordHashingBusy('all password hashing slots are busy')
+        try:
+            return self._executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    async def arun(self, func, *args):
+        """run awaiting the hash in the event loop, without holding a thread while it waits"""
+        if self._executor is None:
+            self._setup()
+        deadline = time.monotonic() + settings.PASSWORD_HASHING_QUEUE_TIMEOUT
+        while not self._slots.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                raise PasswordHashingBusy('all password hashing slots are busy')
+            await asyncio.sleep(SLOT_POLL_INTERVAL)
+        try:
+            return await asyncio.wrap_future(self._executor.submit(func, *args))
+        finally:
+            self._slots.release()
+
+
+hashing_pool = HashingPool()
+
+
+@contextmanager
+def prehashed_passwords():
+    """collect the results of prehash for the sync code run in the block"""
+    token = _prehashed.set({})
+    try:
+        yield
+    finally:
+        _prehashed.reset(token)
+
+
+async def prehash(password, encoded=None):
+    """
+    hash ahead of the sync view an async view runs next, so the view's database thread doesn't wait
+    on the pool: the verification against encoded (and its upgrade if its costs are outdated), or
+    without encoded, a new hash of password. only argon2 hashes are done ahead, needs prehashed_passwords
+    """
+    results = _prehashed.get()
+    if encoded is not None:
+        try:
+            hasher = identify_hasher(encoded)
+        except ValueError:
+            return
+        if not isinstance(hasher, Argon2PasswordHasher):
+            return
+        verified = await hashing_pool.arun(BaseArgon2PasswordHasher.verify, hasher, password, encoded)
+        results['verify', password, encoded] = verified
+        if not verified or not hasher.must_update(encoded):
+            return
+    hasher = Argon2PasswordHasher()
+    results['encode', password] = await hashing_pool.arun(
+        BaseArgon2PasswordHasher.encode, hasher, password, hasher.salt()
+    )
+
+
+class Argon2PasswordHasher(BaseArgon2PasswordHasher):
+    """
+    argon2 with cost parameters taken from settings and hashing done on the bounded pool.
+    passwords hashed with other parameters are rehashed by django on the next successful login
+    """
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+    def encode(self, password, salt):
+        # a prehashed password comes with its own salt
+        results = _prehashed.get()
+        if results and ('encode', password) in results:
+            return results.pop(('encode', password))
+        return hashing_pool.run(super().encode, password, salt)
+
+    def verify(self, password, encoded):
+        results = _prehashed.get()
+        if results and ('verify', password, encoded) in results:
+            return results.pop(('verify', password, encoded))
+        return hashing_pool.run(super().verify, password, encoded)
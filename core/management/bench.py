@@ -0,0 +1,56 @@
+import time
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+
+from core.models import Tag, Recipe
+
+User = get_user_model()
+
+BENCH_EMAIL = 'bench-asgi@example.com'
+BENCH_TAG_PREFIX = 'bench asgi tag '
+
+
+def seed_committed(recipes_count, stdout):
+    """a committed user with tagged recipes, the handlers' threads can't see an open transaction"""
+    stdout.write(f'Seeding {recipes_count} recipes ....')
+    # left behind by an interrupted run
+    cleanup()
+    user = User.objects.create_user(email=BENCH_EMAIL, password='bench_password')
+    tags = Tag.objects.bulk_create(Tag(creator=user, name=f'{BENCH_TAG_PREFIX}{i}') for i in range(10))
+    Recipe.objects.bulk_create(
+        Recipe(creator=user, title=f'bench recipe {i}', time_minutes=i % 240, price=i % 9999 / 100)
+        for i in range(recipes_count)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe_id, tag_id=tags[recipe_id % 10].id)
+        for recipe_id in Recipe.objects.filter(creator=user).values_list('id', flat=True)
+    )
+    return user, Token.objects.create(user=user)
+
+
+def cleanup():
+    """recipes and tags outlive their creator, so they are deleted first, the tags by name"""
+    Recipe.objects.filter(creator__email=BENCH_EMAIL).delete()
+    Tag.objects.filter(name__startswith=BENCH_TAG_PREFIX).delete()
+    User.objects.filter(email=BENCH_EMAIL).delete()
+
+
+def wsgi_request(application, path, key, delay):
+    """a request whose worker thread is held while the slow client reads the response"""
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+        'HTTP_AUTHORIZATION': f'Token {key}', 'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http',
+    }
+    status = []
+    response = application(environ, lambda value, headers, exc_info=None: status.append(int(value[:3])))
+    try:
+        for _ in response:
+            pass
+        time.sleep(delay)
+    finally:
+        response.close()
+    return status[0]
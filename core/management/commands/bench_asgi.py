@@ -0,0 +1,121 @@
+import asyncio
+import itertools
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db.backends.signals import connection_created
+
+from core.management.bench import cleanup, seed_committed, wsgi_request
+from core.models import Recipe
+from recipe_app_api.asgi import AsyncViewsASGIHandler
+
+MODES = 'wsgi', 'asgi-sync', 'asgi'
+
+
+class Command(BaseCommand):
+    """Compare WSGI, ASGI with the sync DRF views and ASGI with the async views under slow clients"""
+    help = ('Drives the handlers in process with concurrent clients which take --client-delay to read each '
+            'response, reports throughput and latency. Seeds committed data and deletes it afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=MODES, action='append')
+        parser.add_argument('--clients', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--client-delay', type=float, default=0.2, help='seconds a client takes to read a response')
+        parser.add_argument('--threads', type=int, default=32, help='worker threads of the WSGI server')
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--path', default='/recipe/recipe/{id}/', help='{id} is replaced by recipe ids in turn')
+        parser.add_argument('--query-latency', type=float, default=0,
+                            help='seconds added to every query, to emulate a database across the network')
+
+    def handle(self, *args, **options):
+        user, token = seed_committed(options['recipes'], self.stdout)
+        if options['query_latency']:
+            connection_created.connect(self.add_latency(options['query_latency']), weak=False)
+        try:
+            ids = list(Recipe.objects.filter(creator=user).values_list('id', flat=True))
+            paths = (options['path'].format(id=pk) for pk in itertools.cycle(ids))
+            for mode in options['mode'] or MODES:
+                latencies, statuses, elapsed = asyncio.run(self.run(mode, paths, token.key, options))
+                self.report(mode, latencies, statuses, elapsed)
+        finally:
+            cleanup()
+
+    async def run(self, mode, paths, key, options):
+        """run --requests requests from --clients concurrent clients through the handler of mode"""
+        if mode == 'wsgi':
+            application = WSGIHandler()
+            server = ThreadPoolExecutor(max_workers=options['threads'], thread_name_prefix='wsgi')
+            loop = asyncio.get_running_loop()
+
+            def request(path):
+                return loop.run_in_executor(server, wsgi_request, application, path, key, options['client_delay'])
+        else:
+            application = AsyncViewsASGIHandler() if mode == 'asgi' else ASGIHandler()
+
+            def request(path):
+                return self.asgi_request(application, path, key, options['client_delay'])
+
+        remaining = itertools.count(options['requests'], -1)
+        latencies, statuses = [], Counter()
+
+        async def client():
+            while next(remaining) > 0:
+                start = time.perf_counter()
+                statuses[await request(next(paths))] += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options['clients'])))
+        elapsed = time.perf_counter() - start
+        if mode == 'wsgi':
+            server.shutdown()
+        return latencies, statuses, elapsed
+
+    def add_latency(self, latency):
+        def wait(execute, sql, params, many, context):
+            # sleeping releases the GIL like waiting on a socket does
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_wrapper(sender, connection, **kwargs):
+            # sent again on every reconnect of the thread's connection
+            if wait not in connection.execute_wrappers:
+                connection.execute_wrappers.append(wait)
+        return add_wrapper
+
+    async def asgi_request(self, application, path, key, delay):
+        """a request whose slow client only holds a coroutine while reading the response"""
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'authorization', f'Token {key}'.encode())],
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        status = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif not message.get('more_body'):
+                await asyncio.sleep(delay)
+
+        await application(scope, receive, send)
+        return status[0]
+
+    def report(self, mode, latencies, statuses, elapsed):
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{mode}: {len(latencies) / elapsed:.0f} requests/s, '
+            f'latency p50 {statistics.median(latencies) * 1000:.0f}ms p99 {p99 * 1000:.0f}ms, statuses {dict(statuses)}'
+        ))
@@ -0,0 +1,65 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from core.models import Tag, Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Compare the DISTINCT join and the EXISTS subquery used for assigned_only"""
+    help = 'Seeds a throwaway library, times both assigned_only queries and rolls everything back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tags', type=int, default=10000)
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(options['tags'], options['recipes'], options['tags_per_recipe'])
+            queryset = Tag.objects.filter(creator=user).order_by('-name')
+            querysets = {
+                'distinct': queryset.filter(recipe__isnull=False).distinct(),
+                'exists': queryset.assigned(),
+            }
+            for name, queryset in querysets.items():
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{name}:'))
+                self.stdout.write(queryset.explain())
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    count = len(queryset.all())
+                    timings.append(time.perf_counter() - start)
+                self.stdout.write(f'{count} rows, best of {options["repeat"]}: {min(timings) * 1000:.1f}ms')
+            transaction.set_rollback(True)
+
+    def seed(self, tags_count, recipes_count, tags_per_recipe):
+        """create a user with the requested number of tags and tagged recipes"""
+        self.stdout.write(f'Seeding {tags_count} tags and {recipes_count} recipes ....')
+        user = User.objects.create_user(email='bench-assigned-only@example.com', password='bench_password')
+        Tag.objects.bulk_create(
+            (Tag(creator=user, name=f'bench tag {i}') for i in range(tags_count)), batch_size=5000
+        )
+        Recipe.objects.bulk_create(
+            (Recipe(creator=user, title=f'bench recipe {i}', time_minutes=10, price=5)
+             for i in range(recipes_count)),
+            batch_size=5000
+        )
+        # only half of the tags are used so both queries have something to filter out
+        tag_ids = list(Tag.objects.filter(creator=user).values_list('id', flat=True)[:max(tags_count // 2, 1)])
+        recipe_ids = Recipe.objects.filter(creator=user).values_list('id', flat=True)
+        Recipe.tags.through.objects.bulk_create(
+            (Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+             for recipe_id in recipe_ids.iterator()
+             for tag_id in set(random.sample(tag_ids, min(tags_per_recipe, len(tag_ids))))),
+            batch_size=5000
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        return user
@@ -0,0 +1,61 @@
+import statistics
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from core.management.bench import cleanup, seed_committed, wsgi_request
+from core.models import Recipe
+
+MODES = {
+    'new connection per request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': False},
+    'persistent, health checked': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+}
+
+
+class Command(BaseCommand):
+    """Compare request latency with a new database connection per request and with persistent connections"""
+    help = ('Sends requests one after another through the WSGI handler with each connection setting, reports '
+            'latency. Seeds committed data and deletes it afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--path', default='/recipe/recipe/{id}/', help='{id} is replaced by recipe ids in turn')
+        parser.add_argument('--connect-latency', type=float, default=0,
+                            help='seconds added to every new connection, to emulate a TCP/TLS/auth handshake '
+                                 'with a database across the network')
+
+    def handle(self, *args, **options):
+        user, token = seed_committed(options['recipes'], self.stdout)
+        if options['connect_latency']:
+            connection_created.connect(
+                lambda **kwargs: time.sleep(options['connect_latency']), weak=False
+            )
+        settings_dict = connection.settings_dict
+        original = {key: settings_dict.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+        try:
+            ids = list(Recipe.objects.filter(creator=user).values_list('id', flat=True))
+            application = WSGIHandler()
+            for mode, mode_settings in MODES.items():
+                connection.close()
+                settings_dict.update(mode_settings)
+                latencies = []
+                for i in range(options['requests']):
+                    path = options['path'].format(id=ids[i % len(ids)])
+                    start = time.perf_counter()
+                    status = wsgi_request(application, path, token.key, 0)
+                    latencies.append(time.perf_counter() - start)
+                    assert status == 200, f'{path} answered {status}'
+                latencies.sort()
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'{mode}: mean {statistics.mean(latencies) * 1000:.2f}ms, '
+                    f'p50 {statistics.median(latencies) * 1000:.2f}ms, '
+                    f'p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}ms'
+                ))
+        finally:
+            settings_dict.update(original)
+            cleanup()
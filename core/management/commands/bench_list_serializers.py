@@ -0,0 +1,79 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.readers import ValuesReader
+from recipe.serializers import RecipeSerializer, TagSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Compare DRF serializers with the .values() based list readers"""
+    help = 'Seeds a throwaway library, times both list serialization paths and rolls everything back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=1000)
+        parser.add_argument('--related-per-recipe', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(options['recipes'], options['tags'], options['related_per_recipe'])
+            recipes = Recipe.objects.filter(creator=user).order_by('id')
+            tags = Tag.objects.filter(creator=user).order_by('-name')
+            paths = {
+                'recipes, serializer': lambda: RecipeSerializer(recipes.with_related_ids(), many=True).data,
+                'recipes, reader': self.reader(RecipeSerializer(), recipes),
+                'tags, serializer': lambda: TagSerializer(tags.all(), many=True).data,
+                'tags, reader': self.reader(TagSerializer(), tags),
+            }
+            for name, path in paths.items():
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    count = len(path())
+                    timings.append(time.perf_counter() - start)
+                best = min(timings)
+                self.stdout.write(f'{name}: {count} rows, best of {options["repeat"]}: {best * 1000:.1f}ms, '
+                                  f'{count / best:.0f} rows/s')
+            transaction.set_rollback(True)
+
+    def reader(self, serializer, queryset):
+        reader = ValuesReader(serializer)
+        return lambda: reader.represent(reader.values(queryset.all()))
+
+    def seed(self, recipes_count, tags_count, related_per_recipe):
+        """create a user with tagged recipes which also have ingredients"""
+        self.stdout.write(f'Seeding {recipes_count} recipes and {tags_count} tags/ingredients ....')
+        user = User.objects.create_user(email='bench-serializers@example.com', password='bench_password')
+        Tag.objects.bulk_create(
+            (Tag(creator=user, name=f'bench serializer tag {i}') for i in range(tags_count)), batch_size=5000
+        )
+        Ingredient.objects.bulk_create(
+            (Ingredient(creator=user, name=f'bench serializer ingredient {i}') for i in range(tags_count)),
+            batch_size=5000
+        )
+        Recipe.objects.bulk_create(
+            (Recipe(creator=user, title=f'bench recipe {i}', time_minutes=10, price=5, link='https://example.com')
+             for i in range(recipes_count)),
+            batch_size=5000
+        )
+        recipe_ids = list(Recipe.objects.filter(creator=user).values_list('id', flat=True))
+        for relation, model, column in (('tags', Tag, 'tag_id'), ('ingredients', Ingredient, 'ingredient_id')):
+            through = getattr(Recipe, relation).through
+            related_ids = list(model.objects.filter(creator=user).values_list('id', flat=True))
+            through.objects.bulk_create(
+                (through(recipe_id=recipe_id, **{column: related_id})
+                 for recipe_id in recipe_ids
+                 for related_id in random.sample(related_ids, related_per_recipe)),
+                batch_size=5000
+            )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        return user
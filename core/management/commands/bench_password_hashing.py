@@ -0,0 +1,38 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Measure password verifications (logins) per second with the configured argon2 costs"""
+    help = 'Runs concurrent password verifications through the default hasher and reports logins/sec'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--concurrency', type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        hasher = get_hasher()
+        encoded = hasher.encode('benchmark password', hasher.salt())
+        self.stdout.write(f'{hasher.algorithm}: {hasher.safe_summary(encoded)}')
+        deadline = time.perf_counter() + options['seconds']
+
+        def login_loop():
+            count = 0
+            while time.perf_counter() < deadline:
+                hasher.verify('benchmark password', encoded)
+                count += 1
+            return count
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            futures = [executor.submit(login_loop) for _ in range(options['concurrency'])]
+            logins = sum(future.result() for future in futures)
+        elapsed = time.perf_counter() - start
+        cores = os.cpu_count() or 1
+        self.stdout.write(self.style.SUCCESS(
+            f'{logins / elapsed:.1f} logins/sec with {options["concurrency"]} concurrent logins '
+            f'({logins / elapsed / cores:.1f} per core on {cores} cores)'
+        ))
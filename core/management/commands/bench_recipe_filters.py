@@ -0,0 +1,69 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Recipe
+from recipe.views import RecipeViewSet
+
+User = get_user_model()
+
+# query params and the number of rows fetched, like the first cursor page of that size would
+QUERIES = (
+    ({'max_time': 15}, None),
+    ({'max_price': '10'}, None),
+    ({'min_price': '5', 'max_price': '10', 'max_time': 30}, None),
+    ({'max_price': '10', 'ordering': 'price'}, 51),
+    ({'max_time': 30, 'ordering': '-time_minutes'}, 51),
+)
+
+
+class Command(BaseCommand):
+    """Time the price/time range filters and orderings of the recipe list"""
+    help = 'Seeds a throwaway library, times the recipe range filters and rolls everything back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(options['users'], options['recipes'])
+            factory = APIRequestFactory()
+            for params, limit in QUERIES:
+                request = Request(factory.get('/', params))
+                request.user = user
+                view = RecipeViewSet(request=request, action='list', format_kwarg=None, kwargs={})
+                queryset = view.get_queryset()[:limit]
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{params}, {limit or "all"} rows:'))
+                self.stdout.write(queryset.explain())
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    count = len(queryset.all())
+                    timings.append(time.perf_counter() - start)
+                self.stdout.write(f'{count} rows, best of {options["repeat"]}: {min(timings) * 1000:.1f}ms')
+            transaction.set_rollback(True)
+
+    def seed(self, users_count, recipes_count):
+        """create users with the requested number of recipes each, spread over prices and times"""
+        self.stdout.write(f'Seeding {users_count} users with {recipes_count} recipes each ....')
+        users = [
+            User.objects.create_user(email=f'bench-filters-{i}@example.com', password='bench_password')
+            for i in range(users_count)
+        ]
+        for user in users:
+            Recipe.objects.bulk_create(
+                (Recipe(creator=user, title=f'bench recipe {i}', time_minutes=random.randint(1, 240),
+                        price=random.randint(100, 9999) / 100)
+                 for i in range(recipes_count)),
+                batch_size=5000
+            )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        return users[0]
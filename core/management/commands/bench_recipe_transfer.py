@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.transfer import export_csv, export_ndjson, import_recipes, parse_csv, parse_ndjson
+
+User = get_user_model()
+
+FORMATS = {
+    'ndjson': (export_ndjson, parse_ndjson),
+    'csv': (export_csv, parse_csv),
+}
+
+
+class Command(BaseCommand):
+    """Time streaming exports and imports of a large recipe library"""
+    help = 'Seeds a throwaway library, exports and re-imports it, reports throughput (and peak memory), rolls back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--format', choices=list(FORMATS), default='ndjson')
+        # tracing every allocation slows both phases down several times, so it's opt in
+        parser.add_argument('--trace-memory', action='store_true')
+
+    def handle(self, *args, **options):
+        export, parse = FORMATS[options['format']]
+        with transaction.atomic(), tempfile.TemporaryDirectory() as directory:
+            user = self.seed(options['recipes'])
+            importer = User.objects.create_user(email='bench-transfer-import@example.com', password='bench_password')
+            path = os.path.join(directory, f'recipes.{options["format"]}')
+
+            def run_export():
+                with open(path, 'wb') as output:
+                    output.writelines(export(user))
+
+            def run_import():
+                with open(path, 'rb') as lines:
+                    return import_recipes(importer, parse(lines))
+
+            trace = options['trace_memory']
+            self.measure('export', run_export, options['recipes'], trace)
+            self.stdout.write(f'{os.path.getsize(path) / 1024 / 1024:.1f}MiB written')
+            result = self.measure('import', run_import, options['recipes'], trace)
+            self.stdout.write(f'{result["created"]} created, {result["failed"]} failed')
+            transaction.set_rollback(True)
+
+    def measure(self, name, function, rows, trace_memory):
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        report = f'{name}: {elapsed:.1f}s, {rows / elapsed:.0f} recipes/s'
+        if trace_memory:
+            report += f', peak python memory {tracemalloc.get_traced_memory()[1] / 1024 / 1024:.1f}MiB'
+            tracemalloc.stop()
+        self.stdout.write(self.style.MIGRATE_HEADING(report))
+        return result
+
+    def seed(self, recipes_count):
+        """create a user whose recipes have two tags and two ingredients each"""
+        self.stdout.write(f'Seeding {recipes_count} recipes ....')
+        user = User.objects.create_user(email='bench-transfer@example.com', password='bench_password')
+        tags = Tag.objects.bulk_create(Tag(creator=user, name=f'bench transfer tag {i}') for i in range(100))
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(creator=user, name=f'bench transfer ingredient {i}') for i in range(100)
+        )
+        Recipe.objects.bulk_create(
+            (Recipe(creator=user, title=f'bench recipe {i}', time_minutes=i % 240, price=i % 9999 / 100)
+             for i in range(recipes_count)),
+            batch_size=5000
+        )
+        recipe_ids = Recipe.objects.filter(creator=user).values_list('id', flat=True)
+        for relation, related, column in (('tags', tags, 'tag_id'), ('ingredients', ingredients, 'ingredient_id')):
+            through = getattr(Recipe, relation).through
+            through.objects.bulk_create(
+                (through(recipe_id=recipe_id, **{column: related[(recipe_id + offset) % 100].id})
+                 for recipe_id in recipe_ids.iterator() for offset in (0, 1)),
+                batch_size=5000
+            )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        return user
@@ -0,0 +1,76 @@
+import random
+import string
+import sys
+import time
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import override_settings
+
+from core.models import Ingredient
+from recipe.suggest import NameIndex, local_indexes, suggest_names
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Time ingredient suggestions served from the in-process index and from the database"""
+    help = 'Seeds a throwaway pantry, times suggestions from memory and from the database and rolls everything back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ingredients', type=int, default=20000)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(options['ingredients'])
+            queryset = Ingredient.objects.all()
+            rows = list(queryset.filter(creator=user).values_list('name', 'id'))
+            index = NameIndex(None, rows)
+            size = sys.getsizeof(index.text) + sys.getsizeof(index.offsets) + sys.getsizeof(index.ids)
+            self.stdout.write(f'index of {len(index)} names: {size / 1024:.0f}KiB')
+
+            local_indexes.clear()
+            start = time.perf_counter()
+            suggest_names(queryset, user.pk, 'a', options['limit'])
+            self.stdout.write(f'reading and building the index: {(time.perf_counter() - start) * 1000:.1f}ms')
+            self.time_prefixes('in process', queryset, user, options['limit'], options['repeat'])
+
+            # no user fits, so every suggestion is a database query
+            local_indexes.clear()
+            with override_settings(SUGGEST_CACHE_MAX_NAMES=0):
+                self.time_prefixes('database', queryset, user, options['limit'], options['repeat'])
+            local_indexes.clear()
+            transaction.set_rollback(True)
+
+    def time_prefixes(self, path, queryset, user, limit, repeat):
+        """the median and slowest suggestion for random prefixes of a few lengths"""
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{path}:'))
+        for length in (1, 2, 4):
+            timings = []
+            for _ in range(repeat):
+                prefix = ''.join(random.choices(string.ascii_lowercase, k=length))
+                start = time.perf_counter()
+                suggest_names(queryset, user.pk, prefix, limit)
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            self.stdout.write(
+                f'{length} character prefixes, median {timings[len(timings) // 2] * 1000:.2f}ms, '
+                f'slowest {timings[-1] * 1000:.2f}ms'
+            )
+
+    def seed(self, ingredients_count):
+        """create a user with the requested number of ingredients of random names"""
+        self.stdout.write(f'Seeding {ingredients_count} ingredients ....')
+        user = User.objects.create_user(email='bench-suggest@example.com', password='bench_password')
+        Ingredient.objects.bulk_create(
+            (Ingredient(creator=user, name=''.join(random.choices(string.ascii_lowercase, k=random.randint(3, 12)))
+                        + f' {i}')
+             for i in range(ingredients_count)),
+            batch_size=5000
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        return user
@@ -1,20 +1,99 @@
+import math
+import random
 import time
-from django.core.management.base import BaseCommand
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
 from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
 from django.db.utils import OperationalError
 
+# backends whose driver takes a connect_timeout option, in whole seconds
+CONNECT_TIMEOUT_VENDORS = ('postgresql', 'mysql')
+
+
+class DatabaseNotReady(Exception):
+    """the database accepts queries but isn't ready to serve the app yet"""
+
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available"""
+    help = ('Waits until every database answers a query (and with --check-migrations has no unapplied '
+            'migrations), retrying with jittered exponential backoff until the timeout')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help='alias to wait for, may be repeated. defaults to every configured database',
+        )
+        parser.add_argument('--timeout', type=float, default=60, help='seconds to wait before giving up')
+        parser.add_argument('--initial-delay', type=float, default=0.1)
+        parser.add_argument('--max-delay', type=float, default=5)
+        parser.add_argument('--check-migrations', action='store_true', help='also wait for migrations to be applied')
+
     def handle(self, *args, **options):
         """when we enter the command this method will be called"""
-        self.stdout.write('Waiting for database .... ')
-        db_conn = None
-        while not db_conn:
-            try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('Database unavailable, waiting one second ...')
-                time.sleep(1)
-
+        aliases = options['databases'] or list(connections)
+        self.stdout.write(f'Waiting for database{"s" if len(aliases) > 1 else ""} {", ".join(aliases)} .... ')
+        deadline = time.monotonic() + options['timeout']
+        # every alias is probed on its own thread, so one slow database doesn't delay the others
+        with ThreadPoolExecutor(max_workers=len(aliases), thread_name_prefix='wait-for-db') as executor:
+            futures = [executor.submit(self.wait_for, alias, deadline, options) for alias in aliases]
+            errors = [future.exception() for future in futures]
+        errors = [error for error in errors if error is not None]
+        if errors:
+            raise CommandError('\n'.join(str(error) for error in errors))
         self.stdout.write(self.style.SUCCESS('Database is available now!'))
+
+    def wait_for(self, alias, deadline, options):
+        """probe alias until it's ready, sleeping a random time up to an exponentially growing delay"""
+        attempt = 0
+        connection = connections[alias]
+        settings_dict = connection.settings_dict
+        try:
+            while True:
+                try:
+                    self.limit_connect_timeout(connection, settings_dict, deadline)
+                    self.probe(alias, options['check_migrations'])
+                    break
+                except (OperationalError, DatabaseNotReady) as error:
+                    reason = str(error).strip().split('\n')[0] or type(error).__name__
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(f'{alias}: not ready after {attempt + 1} attempts: {reason}')
+                # full jitter keeps containers started together from retrying in lockstep
+                delay = random.uniform(0, min(options['max_delay'], options['initial_delay'] * 2 ** attempt))
+                attempt += 1
+                self.stdout.write(f'{alias} unavailable ({reason}), retrying in {delay:.2f}s ...')
+                time.sleep(min(delay, remaining))
+        finally:
+            connection.close()
+            connection.settings_dict = settings_dict
+        self.stdout.write(f'{alias} ready after {attempt + 1} attempt{"s" if attempt else ""}')
+
+    @staticmethod
+    def limit_connect_timeout(connection, settings_dict, deadline):
+        """
+        connect with a timeout of what's left until the deadline, so an unresponsive host can't hang the
+        attempt (and the command) past it, which is only checked between attempts
+        """
+        if connection.vendor not in CONNECT_TIMEOUT_VENDORS:
+            return
+        remaining = max(1, math.ceil(deadline - time.monotonic()))
+        options = settings_dict.get('OPTIONS', {})
+        if 'connect_timeout' in options:
+            remaining = min(remaining, options['connect_timeout'])
+        # a copy, the settings dict is shared with the connections of other threads
+        connection.settings_dict = {**settings_dict, 'OPTIONS': {**options, 'connect_timeout': remaining}}
+
+    def probe(self, alias, check_migrations):
+        """one round trip to the database, and the migration plan when asked for"""
+        connection = connections[alias]
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if check_migrations:
+            executor = MigrationExecutor(connection)
+            plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+            if plan:
+                raise DatabaseNotReady(f'{len(plan)} unapplied migrations')
@@ -0,0 +1,45 @@
+import django.contrib.postgres.search
+from django.db import migrations
+
+BACKFILL = """
+UPDATE core_recipe r SET search_vector =
+    setweight(to_tsvector('english'::regconfig, COALESCE(r.title, '')), 'A')
+    || setweight(to_tsvector('english'::regconfig, COALESCE((
+        SELECT string_agg(t.name, ' ') FROM core_tag t
+        JOIN core_recipe_tags rt ON rt.tag_id = t.id WHERE rt.recipe_id = r.id
+    ), '')), 'B')
+    || setweight(to_tsvector('english'::regconfig, COALESCE((
+        SELECT string_agg(i.name, ' ') FROM core_ingredient i
+        JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id WHERE ri.recipe_id = r.id
+    ), '')), 'B');
+"""
+
+
+def create_search_index(apps, schema_editor):
+    """GIN indexes only exist on postgres, other databases search with an in-process index"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE INDEX recipe_search_vector_idx ON core_recipe USING gin (search_vector);')
+    schema_editor.execute(BACKFILL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX recipe_search_vector_idx;')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
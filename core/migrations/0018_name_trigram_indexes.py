@@ -0,0 +1,57 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+INDEXES = (
+    ('tag_name_trgm_idx', 'core_tag'),
+    ('ingredient_name_trgm_idx', 'core_ingredient'),
+)
+
+
+def trigrams_available(schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+class AvailableTrigramExtension(TrigramExtension):
+    """installs pg_trgm when the server ships it, without it prefix lookups use the (creator, name) index"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if trigrams_available(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """trigram indexes serve name LIKE 'prefix%' (and infix matches) under any collation"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    for name, table in INDEXES:
+        schema_editor.execute(f'CREATE INDEX {name} ON {table} USING gin (name gin_trgm_ops);')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name};')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_recipe_search_vector'),
+    ]
+
+    # creating pg_trgm needs a superuser (or, from PostgreSQL 13, CREATE on the database as it's a trusted
+    # extension). where the app's user has neither, run CREATE EXTENSION pg_trgm as one before migrating,
+    # the operation is skipped when the extension is already installed
+    operations = [
+        AvailableTrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['creator', 'time_minutes', 'id'], name='recipe_creator_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['creator', 'price', 'id'], name='recipe_creator_price_idx'),
+        ),
+    ]
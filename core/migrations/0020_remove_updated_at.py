@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-18 22:46
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_recipe_range_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='ingredient',
+            name='updated_at',
+        ),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='updated_at',
+        ),
+        migrations.RemoveField(
+            model_name='tag',
+            name='updated_at',
+        ),
+    ]
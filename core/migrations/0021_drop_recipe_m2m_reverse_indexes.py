@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_remove_updated_at'),
+    ]
+
+    # the foreign key indexes on tag_id and ingredient_id already serve the tags and ingredients filters,
+    # the planner never picked these composites, they only cost every through row write
+    operations = [
+        migrations.RunSQL(
+            'DROP INDEX recipe_tags_tag_recipe_idx;',
+            'CREATE INDEX recipe_tags_tag_recipe_idx ON core_recipe_tags (tag_id, recipe_id);',
+        ),
+        migrations.RunSQL(
+            'DROP INDEX recipe_ingredients_ingredient_recipe_idx;',
+            'CREATE INDEX recipe_ingredients_ingredient_recipe_idx '
+            'ON core_recipe_ingredients (ingredient_id, recipe_id);',
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 22:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_drop_recipe_m2m_reverse_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ingredient',
+            name='ingredient_creator_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tag',
+            name='tag_creator_name_idx',
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['creator', '-name', 'id'], name='ingredient_creator_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['creator', '-name', 'id'], name='tag_creator_name_idx'),
+        ),
+    ]
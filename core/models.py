@@ -2,8 +2,11 @@ import os
 import uuid
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, UserManager as BaseManager
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
+from .storage import recipe_image_storage
+
 
 class UserManager(BaseManager):
     def create_user(self, email=None, password=None, **extra_fields):
@@ -35,6 +38,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True, verbose_name='active')
     is_staff = models.BooleanField(default=False, verbose_name='staff status')
     date_joined = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
@@ -49,10 +53,21 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.is_superuser
 
 
+class TagIngredientQuerySet(models.QuerySet):
+    def assigned(self):
+        """only objects used by at least one recipe, without joining and de-duplicating"""
+        through = self.model.recipe_set.through
+        return self.filter(models.Exists(
+            through.objects.filter(**{self.model._meta.model_name: models.OuterRef('pk')})
+        ))
+
+
 class TagIngredient(models.Model):
     name = models.CharField(max_length=256, unique=True)
     creator = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
 
+    objects = TagIngredientQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -62,6 +77,9 @@ class TagIngredient(models.Model):
 
     class Meta:
         abstract = True
+        indexes = [
+            models.Index(fields=['creator', '-name', 'id'], name='%(class)s_creator_name_idx'),
+        ]
 
 
 class Tag(TagIngredient):
@@ -80,6 +98,43 @@ def recipe_image_location(instance, filename):
     return os.path.join('uploads', 'recipe', file_name)
 
 
+class RecipeQuerySet(models.QuerySet):
+    def filter_related(self, relation, ids, match_all=False):
+        """
+        keep recipes related to any (or all) of the given ids through `relation`,
+        using one EXISTS subquery so no duplicate rows are produced
+        """
+        field = self.model._meta.get_field(relation)
+        ids = set(ids)
+        through = field.remote_field.through.objects.filter(**{
+            field.m2m_field_name(): models.OuterRef('pk'),
+            f'{field.m2m_reverse_field_name()}__in': ids,
+        })
+        if match_all:
+            through = through.values(field.m2m_field_name()).annotate(
+                matched=models.Count(field.m2m_reverse_field_name())
+            ).filter(matched=len(ids))
+        return self.filter(models.Exists(through))
+
+    RELATED_MODELS = {'tags': Tag, 'ingredients': Ingredient}
+
+    def with_related_ids(self, *relations):
+        """prefetch only the primary keys of tags and ingredients (or just the given relations), in id order"""
+        return self.prefetch_related(*(
+            models.Prefetch(relation, queryset=self.RELATED_MODELS[relation].objects.only('id').order_by('id'))
+            for relation in relations or self.RELATED_MODELS
+        ))
+
+    def with_related_details(self, *relations):
+        """prefetch tags and ingredients (or just the given relations) with the fields nested serializers need"""
+        return self.prefetch_related(*(
+            models.Prefetch(
+                relation, queryset=self.RELATED_MODELS[relation].objects.only('id', 'name').order_by('id')
+            )
+            for relation in relations or self.RELATED_MODELS
+        ))
+
+
 class Recipe(models.Model):
     creator = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     title = models.CharField(max_length=256)
@@ -88,7 +143,21 @@ class Recipe(models.Model):
     link = models.CharField(max_length=256, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(upload_to=recipe_image_location, blank=True, null=True)
+    image = models.ImageField(
+        upload_to=recipe_image_location, storage=recipe_image_storage, blank=True, null=True
+    )
+    # weighted title, tag and ingredient names, kept up to date by recipe.search on postgres
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['creator', 'id'], name='recipe_creator_id_idx'),
+            # range filters and sorting on price/time stay one index range scan, id keeps ties ordered
+            models.Index(fields=['creator', 'time_minutes', 'id'], name='recipe_creator_time_idx'),
+            models.Index(fields=['creator', 'price', 'id'], name='recipe_creator_price_idx'),
+        ]
 
     def __str__(self):
         return self.title
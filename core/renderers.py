@@ -0,0 +1,70 @@
+import csv
+import io
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer producing the same compact utf-8 output with orjson when it's installed.
+    types orjson doesn't know (Decimal, lazy strings, querysets, ...) and datetimes go through
+    DRF's encoder so they are represented exactly as before. indented output and installs
+    without orjson use the stdlib renderer
+    """
+    encoder = encoders.JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(
+            data, default=self.encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # escaped by JSONRenderer too, they end lines in javascript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    """one JSON document per line, a list is rendered as one line per item"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return b''.join(super(NDJSONRenderer, self).render(item) + b'\n' for item in items)
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    a header row and one row per dict of a list (or a single dict), lists and dicts
+    in cells are written as JSON. the header is the keys of the first row, unless
+    renderer_context has another 'header', None for none (e.g. the chunks after the first)
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        header = (renderer_context or {}).get('header', rows[0].keys() if rows else None)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if header:
+            writer.writerow(header)
+        json_renderer = FastJSONRenderer()
+        for row in rows:
+            writer.writerow(
+                json_renderer.render(value).decode() if isinstance(value, (list, dict)) else value
+                for value in row.values()
+            )
+        return buffer.getvalue().encode(self.charset)
@@ -0,0 +1,71 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_name(name, digest):
+    """storage name of a blob: the upload directory, a fan-out level and the content hash"""
+    directory, file_name = os.path.split(name)
+    extension = file_name.rsplit('.', 1)[1].lower() if '.' in file_name else ''
+    file_name = f'{digest}.{extension}' if extension else digest
+    return os.path.join(directory, digest[:2], file_name)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    stores every file under the sha256 of its content, hashed while the upload is streamed,
+    so identical uploads share one file. saving existing content only refreshes its mtime,
+    which is what garbage collection uses to leave freshly (re)used blobs alone
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # names are derived from content in _save, an existing name means the same content
+        return name
+
+    def _save(self, name, content):
+        if hasattr(content, 'temporary_file_path'):
+            return self._save_temporary_file(name, content.temporary_file_path())
+
+        directory = self.path(os.path.dirname(name))
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks(HASH_CHUNK_SIZE):
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            return self._store(name, digest.hexdigest(), temp_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _save_temporary_file(self, name, temp_path):
+        """uploads already on disk are hashed in place and moved instead of being copied"""
+        digest = hashlib.sha256()
+        with open(temp_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return self._store(name, digest.hexdigest(), temp_path)
+
+    def _store(self, name, digest, temp_path):
+        final_name = content_name(name, digest).replace('\\', '/')
+        final_path = self.path(final_name)
+        if os.path.exists(final_path):
+            os.utime(final_path)
+            return final_name
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        file_move_safe(temp_path, final_path, allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(final_path, self.file_permissions_mode)
+        return final_name
+
+
+recipe_image_storage = ContentAddressedStorage()
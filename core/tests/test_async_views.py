@@ -0,0 +1,200 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, override_settings
+from django.urls import resolve, reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from core.async_views import StreamThreads, StreamThreadsBusy, database_iterate, database_sync_to_async
+from core.hashers import hashing_pool
+from core.models import Recipe, Tag
+from recipe_app_api.asgi import AsyncViewsASGIHandler
+from user.authentication import CachedTokenAuthentication, local_cache
+
+User = get_user_model()
+ASGI_URLCONF = 'recipe_app_api.asgi_urls'
+RECIPES_URL = reverse('recipe:recipes-list')
+TAGS_URL = reverse('recipe:tags-list')
+EXPORT_URL = reverse('recipe:recipes-export')
+ME_URL = reverse('user:me')
+JSON = 'application/json'
+
+
+class AsyncURLConfTests(SimpleTestCase):
+    """the ASGI urlconf has the same urls, with async views for recipes, tags, ingredients and the user"""
+
+    def test_async_views(self):
+        for url in (RECIPES_URL, TAGS_URL, reverse('recipe:ingredients-list'), EXPORT_URL, ME_URL):
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(url, ASGI_URLCONF).func), url)
+
+    def test_signup_and_login_are_async(self):
+        for url in (reverse('user:create'), reverse('user:token')):
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(url, ASGI_URLCONF).func), url)
+
+    def test_other_views_stay_sync(self):
+        self.assertFalse(asyncio.iscoroutinefunction(resolve(reverse('admin:index'), ASGI_URLCONF).func))
+
+    def test_url_names_are_kept(self):
+        match = resolve(reverse('recipe:recipes-detail', args=[1]), ASGI_URLCONF)
+        self.assertEqual(match.view_name, 'recipe:recipes-detail')
+        self.assertEqual(match.kwargs, {'pk': '1'})
+
+    @override_settings(ASYNC_DB_WORKERS=2)
+    def test_database_pool(self):
+        thread = asyncio.run(database_sync_to_async(threading.current_thread)())
+        self.assertTrue(thread.name.startswith('async-db'))
+
+    def test_database_iterate_on_one_thread(self):
+        async def threads():
+            async with StreamThreads().reserve() as executor:
+                return [
+                    thread async for thread in database_iterate(
+                        (threading.current_thread() for _ in range(3)), executor
+                    )
+                ]
+        threads = asyncio.run(threads())
+        self.assertEqual(len(set(threads)), 1)
+        self.assertTrue(threads[0].name.startswith('async-db-stream'))
+
+    @override_settings(ASYNC_DB_STREAM_WORKERS=2, ASYNC_DB_STREAM_QUEUE_TIMEOUT=0.05)
+    def test_stream_threads_are_bounded(self):
+        stream_threads = StreamThreads()
+
+        async def stream(release):
+            async with stream_threads.reserve() as executor:
+                await release.wait()
+                return executor
+
+        async def streams():
+            release = asyncio.Event()
+            first = [asyncio.create_task(stream(release)) for _ in range(2)]
+            await asyncio.sleep(0)
+            # a third waits for one of the first two, and is shed once it waited too long
+            with self.assertRaises(StreamThreadsBusy):
+                await stream(release)
+            waiting = asyncio.create_task(stream(release))
+            await asyncio.sleep(0)
+            release.set()
+            return await asyncio.gather(*first), await waiting
+        first, waiting = asyncio.run(streams())
+        self.assertEqual(len(set(first)), 2)
+        self.assertIn(waiting, first)
+
+
+@override_settings(ASYNC_DB_WORKERS=0)
+class AsyncViewTests(APITestCase):
+    """async views answer like the DRF views they wrap"""
+    def setUp(self) -> None:
+        local_cache.clear()
+        self.user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf', name='hiwa')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        recipe = Recipe.objects.create(creator=self.user, title='chilli', time_minutes=30, price='4.50')
+        recipe.tags.add(Tag.objects.create(name='vegan', creator=self.user))
+
+    async def request(self, method, url, *args, **kwargs):
+        """a request through the ASGI urlconf"""
+        kwargs.setdefault('AUTHORIZATION', f'Token {self.token.key}')
+        with override_settings(ROOT_URLCONF=ASGI_URLCONF):
+            return await getattr(self.async_client, method)(url, *args, **kwargs)
+
+    async def sync_get(self, url, data=None):
+        """the response of the sync view"""
+        return await sync_to_async(self.client.get)(url, data)
+
+    async def test_same_responses_as_sync_views(self):
+        for url in (RECIPES_URL, TAGS_URL, ME_URL):
+            expected = await self.sync_get(url)
+            response = await self.request('get', url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.content, expected.content)
+
+    async def test_cached_token_is_checked_in_event_loop(self):
+        await self.sync_get(ME_URL)
+        # DRF's authenticators don't run again
+        with patch.object(CachedTokenAuthentication, 'authenticate', side_effect=AssertionError):
+            response = await self.request('get', ME_URL)
+        self.assertEqual(response.json()['email'], 'hiwa@gmail.com')
+
+    async def test_invalid_token_is_rejected(self):
+        response = await self.request('get', RECIPES_URL, AUTHORIZATION='Token invalid')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    async def test_writes(self):
+        response = await self.request('patch', ME_URL, {'name': 'new name'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = await self.request(
+            'post', RECIPES_URL, {'title': 'toast', 'time_minutes': 5, 'price': '1.00', 'tags': [], 'ingredients': []},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(await sync_to_async(lambda: User.objects.get(pk=self.user.pk).name)(), 'new name')
+        self.assertTrue(await sync_to_async(Recipe.objects.filter(creator=self.user, title='toast').exists)())
+
+    async def test_streaming_responses_stay_streamed(self):
+        expected = await self.sync_get(EXPORT_URL, {'format': 'ndjson'})
+        content = await sync_to_async(b''.join)(expected.streaming_content)
+        response = await self.request('get', EXPORT_URL, {'format': 'ndjson'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(await sync_to_async(b''.join)(response.streaming_content), content)
+        self.assertEqual(response['Content-Disposition'], expected['Content-Disposition'])
+
+    async def handle(self, response):
+        """the ASGI messages the handler sends for response"""
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+        # as in django's test client, finishing the response mustn't close the test's connection
+        request_finished.disconnect(close_old_connections)
+        try:
+            await AsyncViewsASGIHandler().send_response(response, send)
+        finally:
+            request_finished.connect(close_old_connections)
+        return messages
+
+    async def test_handler_reads_streamed_bodies_a_chunk_at_a_time(self):
+        await sync_to_async(Recipe.objects.create)(creator=self.user, title='toast', time_minutes=5, price='1.00')
+        # the queries run on the first chunk, which the event loop couldn't do
+        def titles():
+            for recipe in Recipe.objects.order_by('id'):
+                yield f'{recipe.title}\n'.encode()
+        messages = await self.handle(StreamingHttpResponse(titles(), content_type='text/plain'))
+        self.assertEqual(messages[0]['type'], 'http.response.start')
+        self.assertIn((b'Content-Type', b'text/plain'), messages[0]['headers'])
+        self.assertEqual([message['body'] for message in messages[1:-1]], [b'chilli\n', b'toast\n'])
+        self.assertTrue(all(message['more_body'] for message in messages[1:-1]))
+        self.assertEqual(messages[-1], {'type': 'http.response.body'})
+
+    @override_settings(ASYNC_DB_WORKERS=2)
+    async def test_handler_sheds_streams_when_threads_are_busy(self):
+        response = StreamingHttpResponse(iter([b'chunk']), content_type='text/plain')
+        with patch.object(StreamThreads, 'reserve', side_effect=StreamThreadsBusy):
+            messages = await self.handle(response)
+        self.assertEqual(messages[0]['status'], status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn((b'Retry-After', b'5'), messages[0]['headers'])
+        self.assertNotIn(b'chunk', b''.join(message.get('body', b'') for message in messages))
+
+    async def test_signup_and_login_hash_in_event_loop(self):
+        credentials = {'email': 'new@gmail.com', 'password': 'new_asdf123'}
+        # django 3.2's async test client can't send multipart bodies
+        token_url = reverse('user:token')
+        # the views' database threads never wait on the hashing pool
+        with patch.object(hashing_pool, 'run', side_effect=AssertionError):
+            response = await self.request('post', reverse('user:create'), credentials, content_type=JSON)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            response = await self.request('post', token_url, credentials, content_type=JSON)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('token', response.json())
+            for wrong in ({**credentials, 'password': 'wrong'}, {**credentials, 'email': 'nobody@gmail.com'}):
+                response = await self.request('post', token_url, wrong, content_type=JSON)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,22 +1,83 @@
+from io import StringIO
+
 from django.db.utils import OperationalError
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 
 class CommandTests(TestCase):
 
+    def connection(self, *errors):
+        """a connection whose first connection attempts fail with errors"""
+        connection = MagicMock()
+        connection.ensure_connection.side_effect = list(errors) + [None]
+        return connection
+
     def test_wait_for_db_ready(self):
         """waiting for db when db is ready"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        connection = self.connection()
+        with patch('django.db.utils.ConnectionHandler.__getitem__', return_value=connection):
+            call_command('wait_for_db', stdout=StringIO())
+        self.assertEqual(connection.ensure_connection.call_count, 1)
+        connection.cursor().__enter__().execute.assert_called_with('SELECT 1')
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """testing wait for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        connection = self.connection(*[OperationalError] * 5)
+        with patch('django.db.utils.ConnectionHandler.__getitem__', return_value=connection):
+            call_command('wait_for_db', stdout=StringIO())
+        self.assertEqual(connection.ensure_connection.call_count, 6)
+        self.assertEqual(ts.call_count, 5)
+
+    @patch('random.uniform', side_effect=lambda low, high: high)
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_backoff(self, ts, uniform):
+        """delays double up to the maximum, with jitter below them"""
+        connection = self.connection(*[OperationalError] * 5)
+        with patch('django.db.utils.ConnectionHandler.__getitem__', return_value=connection):
+            call_command('wait_for_db', stdout=StringIO(), initial_delay=1, max_delay=5)
+        self.assertEqual([call.args[0] for call in ts.call_args_list], [1, 2, 4, 5, 5])
+        self.assertEqual([call.args[0] for call in uniform.call_args_list], [0] * 5)
+
+    def test_wait_for_db_timeout(self):
+        """giving up once the deadline passes"""
+        connection = MagicMock()
+        connection.ensure_connection.side_effect = OperationalError('connection refused')
+        with patch('django.db.utils.ConnectionHandler.__getitem__', return_value=connection):
+            with self.assertRaisesMessage(CommandError, 'default: not ready after 1 attempts: connection refused'):
+                call_command('wait_for_db', stdout=StringIO(), timeout=0)
+
+    def test_wait_for_every_database(self):
+        """every alias is probed, or only those passed with --database"""
+        connection = MagicMock()
+        with patch('django.db.utils.ConnectionHandler.__getitem__', return_value=connection), \
+                patch('django.db.utils.ConnectionHandler.__iter__', return_value=iter(['default', 'replica'])):
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(connection.ensure_connection.call_count, 2)
+            call_command('wait_for_db', stdout=StringIO(), databases=['default'])
+            self.assertEqual(connection.ensure_connection.call_count, 3)
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_check_migrations(self, ts):
+        """with --check-migrations the database is ready once nothing is left to migrate"""
+        with patch('django.db.migrations.executor.MigrationExecutor.migration_plan') as plan:
+            plan.side_effect = [[('core', '0001_initial')], []]
+            call_command('wait_for_db', stdout=StringIO(), check_migrations=True)
+        self.assertEqual(plan.call_count, 2)
+        self.assertEqual(ts.call_count, 1)
+
+    def test_wait_for_db_connect_timeout(self):
+        """connection attempts time out by the deadline, without changing the configured settings"""
+        settings_dict = {'OPTIONS': {'sslmode': 'require'}}
+        connection = MagicMock(vendor='postgresql')
+        connection.settings_dict = settings_dict
+        timeouts = []
+        connection.ensure_connection.side_effect = lambda: timeouts.append(connection.settings_dict['OPTIONS'])
+        with patch('django.db.utils.ConnectionHandler.__getitem__', return_value=connection):
+            call_command('wait_for_db', stdout=StringIO(), timeout=30)
+        self.assertEqual(timeouts, [{'sslmode': 'require', 'connect_timeout': 30}])
+        self.assertIs(connection.settings_dict, settings_dict)
+        self.assertEqual(settings_dict, {'OPTIONS': {'sslmode': 'require'}})
@@ -0,0 +1,61 @@
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.db import connections
+from django.db.utils import InterfaceError
+from django.test import SimpleTestCase
+
+from core.db.backends.postgresql.base import DatabaseWrapper
+
+
+@skipUnless(isinstance(connections['default'], DatabaseWrapper), 'needs the postgres backend of core.db')
+class ConnectionHealthCheckTests(SimpleTestCase):
+    """persistent connections dropped by the server are replaced before the next request's first query"""
+    databases = {'default'}
+
+    def setUp(self):
+        # a connection of its own, outside the test case's transaction
+        self.connection = connections.create_connection('default')
+        self.connection.settings_dict = {
+            **self.connection.settings_dict, 'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True,
+        }
+        self.addCleanup(self.connection.close)
+
+    def query(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            return cursor.fetchone()
+
+    def drop(self):
+        """close the connection under django, like a restarted server or a pooler would"""
+        dropped = self.connection.connection
+        dropped.close()
+        # the end of the request
+        self.connection.close_if_unusable_or_obsolete()
+        return dropped
+
+    def test_dropped_connection_is_replaced(self):
+        self.query()
+        dropped = self.drop()
+        self.assertEqual(self.query(), (1,))
+        self.assertIsNot(self.connection.connection, dropped)
+
+    def test_checked_once_per_request(self):
+        self.query()
+        self.connection.close_if_unusable_or_obsolete()
+        with patch.object(self.connection, 'is_usable', wraps=self.connection.is_usable) as is_usable:
+            self.query()
+            self.query()
+        self.assertEqual(is_usable.call_count, 1)
+
+    def test_new_connections_are_not_checked(self):
+        with patch.object(self.connection, 'is_usable') as is_usable:
+            self.query()
+        is_usable.assert_not_called()
+
+    def test_without_health_checks(self):
+        self.connection.settings_dict['CONN_HEALTH_CHECKS'] = False
+        self.query()
+        self.drop()
+        with self.assertRaises(InterfaceError):
+            self.query()
@@ -0,0 +1,165 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import router
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.functional import SimpleLazyObject
+from rest_framework.authtoken.models import Token
+
+from core.checks import check_replica_pin_cache
+from core.db.routers import ReplicaRoutingMiddleware, read_from_replica, reads_from_primary
+from core.models import Recipe, Tag
+
+User = get_user_model()
+REPLICAS = ['replica_0', 'replica_1']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_PIN_SECONDS=10)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    """reads of safe requests go to a replica unless the user just wrote"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User(pk=1, email='hiwa@gmail.com')
+
+    def serve(self, view, method='get'):
+        """what view returns for a request through the middleware"""
+        results = []
+
+        def get_response(request):
+            results.append(view(request))
+            return HttpResponse()
+        ReplicaRoutingMiddleware(get_response)(getattr(RequestFactory(), method)('/'))
+        return results[0]
+
+    def route(self, method='get', user=None, write=False, reads=3):
+        """the databases the reads of a request go to, after authenticating it as user"""
+        def view(request):
+            if user is not None:
+                request.user = user
+            if write:
+                router.db_for_write(Recipe)
+            return [router.db_for_read(Recipe) for _ in range(reads)]
+        return self.serve(view, method)
+
+    def test_safe_requests_read_from_one_replica(self):
+        databases = self.route(user=self.user)
+        self.assertIn(databases[0], REPLICAS)
+        self.assertEqual(set(databases), {databases[0]})
+        self.assertIn(self.route(method='head', user=self.user)[0], REPLICAS)
+
+    def test_unsafe_requests_read_from_primary(self):
+        for method in ('post', 'put', 'patch', 'delete'):
+            self.assertEqual(self.route(method=method, user=self.user), ['default'] * 3, method)
+
+    def test_user_reads_from_primary_after_writing(self):
+        self.route(method='post', user=self.user, write=True)
+        self.assertEqual(self.route(user=self.user), ['default'] * 3)
+        self.assertIn(self.route(user=User(pk=2))[0], REPLICAS)
+
+    def test_reads_after_a_write_in_the_same_request(self):
+        self.assertEqual(self.route(user=self.user, write=True), ['default'] * 3)
+
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_no_pin_without_window(self):
+        self.route(method='post', user=self.user, write=True)
+        self.assertIn(self.route(user=self.user)[0], REPLICAS)
+
+    def test_lazy_session_user_isnt_evaluated(self):
+        def view(request):
+            request.user = SimpleLazyObject(self.fail)
+            router.db_for_write(Recipe)
+            return router.db_for_read(Recipe)
+        self.assertEqual(self.serve(view), 'default')
+
+    def test_reads_from_primary(self):
+        def view(request):
+            request.user = self.user
+            with reads_from_primary():
+                databases = [router.db_for_read(Recipe), read_from_replica()]
+            return databases + [router.db_for_read(Recipe) in REPLICAS, read_from_replica()]
+        self.assertEqual(self.serve(view), ['default', False, True, True])
+
+    def test_read_from_replica_ahead_of_streaming(self):
+        def view(request):
+            request.user = self.user
+            return read_from_replica(), read_from_replica(streaming=True)
+        self.assertEqual(self.serve(view), (False, True))
+        self.route(method='post', user=self.user, write=True)
+        self.assertEqual(self.serve(view), (False, False))
+
+    def test_streamed_bodies_are_routed(self):
+        def view(request):
+            request.user = self.user
+            return StreamingHttpResponse(router.db_for_read(Recipe).encode() for _ in range(3))
+        response = ReplicaRoutingMiddleware(view)(RequestFactory().get('/'))
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertIn(chunks[0], REPLICAS)
+        self.assertEqual(set(chunks), {chunks[0]})
+        self.assertEqual(router.db_for_read(Recipe), 'default')
+
+    def test_credentials_are_read_from_primary(self):
+        def view(request):
+            return [router.db_for_read(model) for model in (Token, User, Session)]
+        self.assertEqual(self.serve(view), ['default'] * 3)
+
+    def test_related_reads_follow_the_instance(self):
+        recipe = Recipe()
+        recipe._state.db = 'replica_1'
+        self.assertEqual(router.db_for_read(Tag, instance=recipe), 'replica_1')
+
+    def test_queries_outside_requests_go_to_primary(self):
+        self.assertEqual(router.db_for_read(Recipe), 'default')
+        self.assertEqual(router.db_for_write(Recipe), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        self.assertEqual(self.route(user=self.user), ['default'] * 3)
+
+    def test_relations_between_primary_and_replicas(self):
+        recipe, tag = Recipe(), Tag()
+        recipe._state.db, tag._state.db = 'replica_0', 'default'
+        self.assertTrue(router.allow_relation(recipe, tag))
+
+    def test_replicas_arent_migrated(self):
+        self.assertTrue(router.allow_migrate('default', 'core'))
+        self.assertFalse(router.allow_migrate('replica_0', 'core'))
+
+    def test_async_requests(self):
+        async def view(request):
+            request.user = self.user
+            database = await sync_to_async(router.db_for_read)(Recipe)
+
+            def body():
+                yield database.encode()
+                yield router.db_for_read(Recipe).encode()
+            return StreamingHttpResponse(body())
+        middleware = ReplicaRoutingMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = asyncio.run(middleware(RequestFactory().get('/')))
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertIn(chunks[0], REPLICAS)
+        self.assertEqual(chunks[1], chunks[0])
+
+
+class ReplicaPinCacheCheckTests(SimpleTestCase):
+    """pins to the primary have to be kept in a cache shared between workers"""
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_process_local_cache_with_replicas(self):
+        errors = check_replica_pin_cache(None)
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS, CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache', 'LOCATION': 'cache:11211'},
+    })
+    def test_shared_cache_with_replicas(self):
+        self.assertEqual(check_replica_pin_cache(None), [])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        self.assertEqual(check_replica_pin_cache(None), [])
@@ -0,0 +1,53 @@
+import asyncio
+
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.test import TestCase, override_settings
+from unittest.mock import MagicMock, patch
+
+from core.hashers import PasswordHashingBusy, hashing_pool, prehash, prehashed_passwords
+
+User = get_user_model()
+
+
+class Argon2PasswordHasherTests(TestCase):
+    """argon2 costs come from settings and outdated hashes are upgraded on login"""
+
+    @override_settings(ARGON2_TIME_COST=1, ARGON2_MEMORY_COST=1024, ARGON2_PARALLELISM=1)
+    def test_cost_parameters_from_settings(self):
+        user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        decoded = identify_hasher(user.password).decode(user.password)
+        self.assertEqual((decoded['time_cost'], decoded['memory_cost'], decoded['parallelism']), (1, 1024, 1))
+
+    def test_rehash_on_login_when_parameters_change(self):
+        with override_settings(ARGON2_TIME_COST=1, ARGON2_MEMORY_COST=1024, ARGON2_PARALLELISM=1):
+            User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        with override_settings(ARGON2_TIME_COST=2, ARGON2_MEMORY_COST=2048, ARGON2_PARALLELISM=1):
+            user = authenticate(email='hiwa@gmail.com', password='hiwa_asdf')
+        user.refresh_from_db()
+        decoded = identify_hasher(user.password).decode(user.password)
+        self.assertEqual((decoded['time_cost'], decoded['memory_cost']), (2, 2048))
+        self.assertTrue(user.check_password('hiwa_asdf'))
+
+    @patch('core.hashers.hashing_pool.run', side_effect=PasswordHashingBusy)
+    def test_busy_pool_raises(self, run):
+        with self.assertRaises(PasswordHashingBusy):
+            User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+
+    def test_prehashed_passwords_are_used(self):
+        """hashes awaited in the event loop aren't computed again by the sync code"""
+        encoded = make_password('hiwa_asdf')
+        with prehashed_passwords():
+            asyncio.run(prehash('hiwa_asdf', encoded))
+            asyncio.run(prehash('new_asdf'))
+            with patch.object(hashing_pool, 'run', side_effect=AssertionError):
+                self.assertTrue(check_password('hiwa_asdf', encoded))
+                new_encoded = make_password('new_asdf')
+        self.assertTrue(check_password('new_asdf', new_encoded))
+
+    @override_settings(PASSWORD_HASHING_QUEUE_TIMEOUT=0)
+    def test_busy_pool_raises_in_event_loop(self):
+        hashing_pool._setup()
+        with patch.object(hashing_pool, '_slots', MagicMock(**{'acquire.return_value': False})):
+            with self.assertRaises(PasswordHashingBusy):
+                asyncio.run(hashing_pool.arun(str))
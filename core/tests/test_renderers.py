@@ -0,0 +1,57 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from core import renderers
+from core.renderers import CSVRenderer, FastJSONRenderer
+
+SAMPLE = {
+    'id': 1,
+    'title': 'crème brûlée ☃ \u2028',
+    'price': Decimal('5.50'),
+    'updated_at': datetime(2026, 10, 18, 12, 30, 15, 123456, tzinfo=timezone.utc),
+    'detail': gettext_lazy('Not found.'),
+    'image_variants': {128: 'http://testserver/media/a_128.webp'},
+    'tags': [OrderedDict([('id', 2), ('name', 'vegan')])],
+    'link': None,
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """the renderer must produce exactly what DRF's JSONRenderer does"""
+
+    @skipIf(renderers.orjson is None, 'orjson is not installed')
+    def test_same_output_as_json_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(SAMPLE), JSONRenderer().render(SAMPLE))
+
+    def test_stdlib_fallback(self):
+        with patch('core.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(SAMPLE), JSONRenderer().render(SAMPLE))
+
+    def test_indented_output(self):
+        media_type = 'application/json; indent=2'
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE, media_type, {}),
+            JSONRenderer().render(SAMPLE, media_type, {}),
+        )
+
+    def test_empty_body(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class CSVRendererTests(SimpleTestCase):
+    """rows of dicts, written in chunks by the recipe export"""
+
+    def test_header_from_first_row(self):
+        rendered = CSVRenderer().render([{'title': 'soup', 'tags': ['a']}, {'title': 'stew', 'tags': []}])
+        self.assertEqual(rendered, b'title,tags\r\nsoup,"[""a""]"\r\nstew,[]\r\n')
+
+    def test_header_from_context(self):
+        self.assertEqual(CSVRenderer().render([], renderer_context={'header': ('title',)}), b'title\r\n')
+        self.assertEqual(CSVRenderer().render([{'title': 'soup'}], renderer_context={'header': None}), b'soup\r\n')
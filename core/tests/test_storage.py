@@ -0,0 +1,50 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import TestCase, override_settings
+
+from core.storage import ContentAddressedStorage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    """files are stored once under the hash of their content"""
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self) -> None:
+        self.storage = ContentAddressedStorage()
+
+    def test_name_is_content_hash(self):
+        digest = hashlib.sha256(b'image bytes').hexdigest()
+        name = self.storage.save('uploads/recipe/photo.JPG', ContentFile(b'image bytes'))
+        self.assertEqual(name, f'uploads/recipe/{digest[:2]}/{digest}.jpg')
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), b'image bytes')
+
+    def test_identical_content_is_stored_once(self):
+        name1 = self.storage.save('uploads/recipe/a.jpg', ContentFile(b'same'))
+        name2 = self.storage.save('uploads/recipe/b.jpg', ContentFile(b'same'))
+        name3 = self.storage.save('uploads/recipe/c.jpg', ContentFile(b'different'))
+        self.assertEqual(name1, name2)
+        self.assertNotEqual(name1, name3)
+        directory = os.path.dirname(self.storage.path(name1))
+        self.assertEqual([name for name in os.listdir(directory) if not name.startswith('.')], [os.path.basename(name1)])
+
+    def test_temporary_uploads_are_moved(self):
+        upload = TemporaryUploadedFile('photo.jpg', 'image/jpeg', 4, None)
+        upload.write(b'data')
+        upload.flush()
+        temp_path = upload.temporary_file_path()
+        name = self.storage.save('uploads/recipe/photo.jpg', upload)
+        self.assertFalse(os.path.exists(temp_path))
+        self.assertTrue(self.storage.exists(name))
+        upload.close()
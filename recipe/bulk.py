@@ -0,0 +1,105 @@
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from core.models import Tag, Ingredient, Recipe
+from .search import schedule_search_update
+from .signals import invalidate
+
+RELATIONS = (
+    ('tags', Tag, 'tag_id'),
+    ('ingredients', Ingredient, 'ingredient_id'),
+)
+SCALAR_FIELDS = 'title', 'time_minutes', 'price', 'link'
+BATCH_SIZE = 2000
+# inserts of names deleted again before they could be read back
+RESOLVE_ATTEMPTS = 3
+
+
+def related_ids_context(items):
+    """load the existing tag and ingredient ids referenced by the items with one query per relation"""
+    context = {}
+    for relation, model, _ in RELATIONS:
+        ids = {
+            int(pk) for item in items if isinstance(item, dict) and isinstance(item.get(relation), list)
+            for pk in item[relation] if isinstance(pk, int) or (isinstance(pk, str) and pk.isdigit())
+        }
+        context[f'{model._meta.model_name}_ids'] = set(
+            model.objects.filter(pk__in=ids).values_list('pk', flat=True)
+        )
+    return context
+
+
+def resolve_names(model, names, creator):
+    """
+    name -> object of the given lowercase tag or ingredient names, creating missing ones for creator
+    with INSERT ... ON CONFLICT DO NOTHING, names taken meanwhile by anyone else are simply kept.
+    names deleted between the insert and the select are inserted again
+    """
+    objects, missing = {}, set(names)
+    for _ in range(RESOLVE_ATTEMPTS):
+        model.objects.bulk_create([model(name=name, creator=creator) for name in missing], ignore_conflicts=True)
+        objects.update(model.objects.filter(name__in=missing).only('id', 'name').in_bulk(field_name='name'))
+        missing.difference_update(objects)
+        if not missing:
+            return objects
+    raise ValidationError({'names': [f'Deleted while being resolved, try again: {", ".join(sorted(missing))}.']})
+
+
+def _write_relations(recipes, items, replace=False):
+    """insert the through rows of every relation in batches, replacing existing ones if asked"""
+    related_creators = set()
+    for relation, model, column in RELATIONS:
+        through = getattr(Recipe, relation).through
+        rows = {
+            recipe.pk: item[relation] for recipe, item in zip(recipes, items) if relation in item
+        }
+        if replace and rows:
+            through.objects.filter(recipe_id__in=rows).delete()
+        through.objects.bulk_create(
+            (through(recipe_id=recipe_id, **{column: pk}) for recipe_id, pks in rows.items() for pk in pks),
+            batch_size=BATCH_SIZE,
+        )
+        related_ids = {pk for pks in rows.values() for pk in pks}
+        related_creators.update(model.objects.filter(pk__in=related_ids).values_list('creator_id', flat=True))
+    return related_creators
+
+
+def bulk_create_recipes(creator, items):
+    """create validated recipe items with a handful of queries regardless of their number"""
+    recipes = [
+        Recipe(creator=creator, **{field: item[field] for field in SCALAR_FIELDS if field in item})
+        for item in items
+    ]
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+        else:
+            for recipe in recipes:
+                recipe.save()
+        related_creators = _write_relations(recipes, items)
+        # bulk writes bypass the model signals the caches rely on
+        invalidate(creator.pk, *related_creators)
+        schedule_search_update(pk__in=[recipe.pk for recipe in recipes])
+    return recipes
+
+
+def bulk_update_recipes(recipes, items):
+    """apply validated partial updates, tags and ingredients given in an item replace the old ones"""
+    fields = {field for item in items for field in SCALAR_FIELDS if field in item}
+    for recipe, item in zip(recipes, items):
+        for field in fields & item.keys():
+            setattr(recipe, field, item[field])
+    with transaction.atomic():
+        if fields:
+            Recipe.objects.bulk_update(recipes, fields, batch_size=BATCH_SIZE)
+        # creators of the tags/ingredients being replaced lose assignments too
+        old_creators = set()
+        for relation, model, column in RELATIONS:
+            replaced = [recipe.pk for recipe, item in zip(recipes, items) if relation in item]
+            old_creators.update(
+                model.objects.filter(recipe__in=replaced).values_list('creator_id', flat=True)
+            )
+        related_creators = _write_relations(recipes, items, replace=True)
+        invalidate(*{recipe.creator_id for recipe in recipes}, *old_creators, *related_creators)
+        schedule_search_update(pk__in=[recipe.pk for recipe in recipes])
+    return recipes
@@ -0,0 +1,124 @@
+import hashlib
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework.response import Response
+
+from core.db.routers import read_from_replica, reads_from_primary
+
+GENERATION_KEY = 'recipe-cache:generation:{user_id}'
+RESPONSE_KEY = 'recipe-cache:response:{user_id}:{generation}:{endpoint}:{params}'
+
+
+def get_cache():
+    return caches[settings.RECIPE_CACHE_ALIAS]
+
+
+def get_generation(user_id):
+    """
+    return the current cache generation of a user, starting a new one if missing.
+    generations are nanosecond timestamps of the user's last change
+    """
+    cache = get_cache()
+    key = GENERATION_KEY.format(user_id=user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # a time based start never collides with responses cached before the counter was evicted
+        generation = time.time_ns()
+        if not cache.add(key, generation, timeout=None):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def bump_generation(*user_ids):
+    """invalidate every cached response of the given users"""
+    cache = get_cache()
+    for user_id in set(user_ids):
+        if user_id is None:
+            continue
+        key = GENERATION_KEY.format(user_id=user_id)
+        generation = max(time.time_ns(), (cache.get(key) or 0) + 1)
+        cache.set(key, generation, timeout=None)
+
+
+def response_key(request, endpoint):
+    """cache key for a user, endpoint and normalized query params"""
+    params = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+    params_hash = hashlib.md5(repr(params).encode()).hexdigest()
+    return RESPONSE_KEY.format(
+        user_id=request.user.pk,
+        generation=get_generation(request.user.pk),
+        endpoint=endpoint,
+        params=params_hash,
+    )
+
+
+def settled(last_modified):
+    """
+    last modified times are only usable as validators once a second has passed,
+    since http dates can't tell apart two changes within the same second
+    """
+    if last_modified is None or timezone.now() - last_modified < timedelta(seconds=1):
+        return None
+    return last_modified
+
+
+def user_version_etag(request, *args, **kwargs):
+    """strong etag of what a user sees at this url, changing with the user's generation"""
+    value = ':'.join((
+        str(request.user.pk),
+        str(get_generation(request.user.pk)),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ))
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def user_version_last_modified(request, *args, **kwargs):
+    generation = get_generation(request.user.pk)
+    return settled(datetime.fromtimestamp(generation / 1e9, tz=timezone.utc))
+
+
+def validators_from_primary(view):
+    """
+    drop the version stamp validators from responses read from a replica, which may not have caught
+    up with the user's generation yet. a client revalidating them would get 304s for stale data
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.status_code != 304 and read_from_replica(streaming=response.streaming):
+            del response['ETag']
+            del response['Last-Modified']
+        return response
+    return wrapper
+
+
+# answers GET with 304 from the user's version stamp, before any query or serialization
+conditional_get = method_decorator([
+    validators_from_primary,
+    condition(etag_func=user_version_etag, last_modified_func=user_version_last_modified),
+])
+
+
+class CachedListMixin:
+    """serve list responses from the per-user cache until one of the user's objects changes"""
+
+    def list(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = response_key(request, self.basename)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        # kept until the user's generation changes, so never read from a replica that may lag behind it
+        with reads_from_primary():
+            response = super().list(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            cache.set(key, response.data, timeout=settings.RECIPE_CACHE_TIMEOUT)
+        return response
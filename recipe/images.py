@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+
+from core.models import Recipe
+from .cache import bump_generation
+
+logger = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+class GeneratedVariants:
+    """
+    bounded in-process LRU of the image names whose variants were all generated, so serializing
+    them doesn't stat storage (a HEAD request on remote storages) for every size of every row
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        with self._lock:
+            # generated for other sizes, from before IMAGE_VARIANT_SIZES changed
+            if self._entries.get(name) != tuple(settings.IMAGE_VARIANT_SIZES):
+                return False
+            self._entries.move_to_end(name)
+            return True
+
+    def add(self, name):
+        with self._lock:
+            self._entries[name] = tuple(settings.IMAGE_VARIANT_SIZES)
+            self._entries.move_to_end(name)
+            while len(self._entries) > settings.IMAGE_VARIANT_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def discard(self, name):
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+generated_variants = GeneratedVariants()
+
+
+def variant_name(name, size):
+    """storage name of a resized variant, next to the original under a variants directory"""
+    directory, file_name = os.path.split(name)
+    stem = file_name.rsplit('.', 1)[0]
+    extension = FORMAT_EXTENSIONS[settings.IMAGE_VARIANT_FORMAT]
+    return os.path.join(directory, 'variants', f'{stem}_{size}.{extension}')
+
+
+def generate_variants(name, creator_id=None):
+    """resize and re-encode the image into every configured size, never upscaling"""
+    try:
+        with Recipe.image.field.storage.open(name) as file, Image.open(file) as original:
+            # let jpeg decoding skip straight to a scale close to the largest variant
+            largest = max(settings.IMAGE_VARIANT_SIZES)
+            original.draft('RGB', (largest, largest))
+            image = original.convert('RGB')
+            for size in sorted(settings.IMAGE_VARIANT_SIZES, reverse=True):
+                variant = image.copy()
+                variant.thumbnail((size, size))
+                buffer = BytesIO()
+                variant.save(buffer, format=settings.IMAGE_VARIANT_FORMAT, quality=settings.IMAGE_VARIANT_QUALITY)
+                target = variant_name(name, size)
+                if default_storage.exists(target):
+                    default_storage.delete(target)
+                default_storage.save(target, ContentFile(buffer.getvalue()))
+                # each smaller size is resized from the previous one instead of the full image
+                image = variant
+    except OSError:
+        logger.exception('could not generate variants of %s', name)
+        return
+    finally:
+        _pending.discard(name)
+    generated_variants.add(name)
+    # list responses cached with the original as a fallback can now point at the variants
+    bump_generation(creator_id)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS, thread_name_prefix='image-variants'
+            )
+    return _executor
+
+
+def schedule_variants(name, creator_id=None):
+    """generate variants on the worker pool once the image is committed, skipping duplicate requests"""
+    if not name or name in _pending:
+        return
+    _pending.add(name)
+
+    def submit():
+        if settings.IMAGE_VARIANT_WORKERS:
+            _get_executor().submit(generate_variants, name, creator_id)
+        else:
+            generate_variants(name, creator_id)
+
+    transaction.on_commit(submit)
+
+
+def variant_urls(recipe, request=None):
+    """
+    urls of the resized variants keyed by size, falling back to the original for
+    variants which don't exist (yet) and scheduling their generation
+    """
+    return image_variant_urls(recipe.image.name, recipe.creator_id, request)
+
+
+def image_variant_urls(name, creator_id=None, request=None):
+    """variant_urls from the stored image name, for rows that aren't model instances"""
+    if not name:
+        return None
+    urls = {}
+    # storage is only checked until every variant of the image is known to exist
+    generated = name in generated_variants
+    missing = False
+    for size in settings.IMAGE_VARIANT_SIZES:
+        variant = variant_name(name, size)
+        if generated or default_storage.exists(variant):
+            url = default_storage.url(variant)
+        else:
+            url = Recipe.image.field.storage.url(name)
+            missing = True
+        urls[str(size)] = request.build_absolute_uri(url) if request is not None else url
+    if missing:
+        schedule_variants(name, creator_id)
+    elif not generated:
+        generated_variants.add(name)
+    return urls
+
+
+def delete_image(name):
+    """remove an image blob and all of its variants from storage"""
+    generated_variants.discard(name)
+    Recipe.image.field.storage.delete(name)
+    for size in settings.IMAGE_VARIANT_SIZES:
+        default_storage.delete(variant_name(name, size))
+
+
+def is_settled(name):
+    """blobs written or reused within the grace period may belong to a transaction still in flight"""
+    try:
+        modified = os.path.getmtime(Recipe.image.field.storage.path(name))
+    except FileNotFoundError:
+        return False
+    return time.time() - modified >= settings.IMAGE_BLOB_GRACE_SECONDS
+
+
+def release_image(name):
+    """once committed, delete an image no recipe references anymore"""
+    if not name:
+        return
+
+    def release():
+        if is_settled(name) and not Recipe.objects.filter(image=name).exists():
+            delete_image(name)
+
+    transaction.on_commit(release)
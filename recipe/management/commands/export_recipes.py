@@ -0,0 +1,29 @@
+import sys
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.transfer import export_csv, export_ndjson
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Export a user's recipe library"""
+    help = 'Streams every recipe of a user as ndjson or csv, tags and ingredients by name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('--format', choices=('ndjson', 'csv'), default='ndjson')
+        parser.add_argument('--output', help='file to write to, stdout by default')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'].lower())
+        except User.DoesNotExist:
+            raise CommandError(f'no user with email {options["email"]}')
+        chunks = export_csv(user) if options['format'] == 'csv' else export_ndjson(user)
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(chunks)
+        else:
+            sys.stdout.buffer.writelines(chunks)
@@ -0,0 +1,109 @@
+import glob
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe.images import delete_image
+
+BATCH_SIZE = 1000
+
+
+def walk_files(path):
+    """yield every file entry below path without building the whole listing in memory"""
+    try:
+        entries = os.scandir(path)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_files(entry.path)
+            else:
+                yield entry
+
+
+class Command(BaseCommand):
+    """Delete recipe image blobs and variants no recipe references anymore"""
+    help = 'Garbage-collects orphaned recipe images under MEDIA_ROOT in one streaming pass'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='only report what would be deleted')
+        parser.add_argument('--grace-seconds', type=int, default=settings.IMAGE_BLOB_GRACE_SECONDS)
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.deleted = self.reclaimed = 0
+        self.storage = storage = Recipe.image.field.storage
+        root = storage.path(os.path.join('uploads', 'recipe'))
+        self.cutoff = cutoff = time.time() - options['grace_seconds']
+
+        batch, variants = [], []
+        for entry in walk_files(root):
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime > cutoff:
+                continue
+            if os.path.basename(os.path.dirname(entry.path)) == 'variants':
+                variants.append(entry)
+            elif entry.name.startswith('.upload-'):
+                # temporary files left behind by interrupted uploads
+                self.remove(entry.path, stat.st_size)
+            else:
+                batch.append((os.path.relpath(entry.path, storage.location).replace(os.sep, '/'), stat.st_size))
+            if len(batch) >= BATCH_SIZE:
+                self.collect(batch)
+                batch = []
+            if len(variants) >= BATCH_SIZE:
+                self.collect_variants(variants)
+                variants = []
+        self.collect(batch)
+        self.collect_variants(variants)
+
+        verb = 'Would delete' if self.dry_run else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {self.deleted} files ({self.reclaimed} bytes)'))
+
+    def collect(self, batch):
+        """delete the blobs of a batch which no recipe references, one query per batch"""
+        names = [name for name, _ in batch]
+        referenced = set(Recipe.objects.filter(image__in=names).values_list('image', flat=True))
+        for name, size in batch:
+            if name not in referenced and self.still_stale(name):
+                self.deleted += 1
+                self.reclaimed += size
+                self.stdout.write(f'orphaned {name}')
+                if not self.dry_run:
+                    delete_image(name)
+
+    def still_stale(self, name):
+        """
+        whether the blob is still older than the grace period. it was listed up to a batch ago, and an upload
+        of the same content since then only touched it, its recipe may not have been saved yet
+        """
+        try:
+            return os.stat(self.storage.path(name)).st_mtime <= self.cutoff
+        except FileNotFoundError:
+            return False
+
+    def collect_variants(self, variants):
+        """variants are orphaned once the blob they were made from is gone"""
+        for entry in variants:
+            stem = entry.name.rsplit('_', 1)[0]
+            source_dir = os.path.dirname(os.path.dirname(entry.path))
+            if glob.glob(os.path.join(glob.escape(source_dir), glob.escape(stem) + '.*')):
+                continue
+            try:
+                size = entry.stat(follow_symlinks=False).st_size
+            except FileNotFoundError:
+                # already removed together with its blob
+                continue
+            self.remove(entry.path, size)
+
+    def remove(self, path, size):
+        self.deleted += 1
+        self.reclaimed += size
+        if not self.dry_run:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
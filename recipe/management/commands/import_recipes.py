@@ -0,0 +1,33 @@
+import sys
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.transfer import import_recipes, parse_csv, parse_ndjson
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Import recipes into a user's library"""
+    help = 'Reads an ndjson or csv export line by line and creates its recipes in batched transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+        parser.add_argument('path', help="export to read, - for stdin")
+        parser.add_argument('--format', choices=('ndjson', 'csv'), help='taken from the file extension by default')
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'].lower())
+        except User.DoesNotExist:
+            raise CommandError(f'no user with email {options["email"]}')
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        parse = parse_csv if file_format == 'csv' else parse_ndjson
+
+        with (sys.stdin.buffer if path == '-' else open(path, 'rb')) as lines:
+            result = import_recipes(user, parse(lines), options['batch_size'])
+        for error in result['errors']:
+            self.stderr.write(f'line {error["line"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(f'{result["created"]} recipes created, {result["failed"]} failed'))
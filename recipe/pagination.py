@@ -0,0 +1,22 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OptInCursorPagination(CursorPagination):
+    """keyset pagination which is only applied when the client asks for a page_size"""
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class RecipeCursorPagination(OptInCursorPagination):
+    ordering = 'id',
+
+    def get_ordering(self, request, queryset, view):
+        """keep the ordering the view asked for, e.g. by search rank or price, ties broken by id"""
+        if queryset.query.order_by:
+            return tuple(queryset.query.order_by)
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeAttrCursorPagination(OptInCursorPagination):
+    ordering = '-name', 'id'
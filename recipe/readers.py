@@ -0,0 +1,192 @@
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from rest_framework import fields as drf_fields, serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, SlugRelatedField
+from rest_framework.response import Response
+
+from core.renderers import FastJSONRenderer
+from .images import image_variant_urls
+
+# fields whose representation is the database value itself
+PASSTHROUGH_FIELDS = drf_fields.IntegerField, drf_fields.CharField, drf_fields.BooleanField
+# method fields that can be computed from columns: name -> (columns, function of row and request)
+METHOD_FIELDS = {
+    'image_variants': (
+        ('image', 'creator_id'),
+        lambda row, request: image_variant_urls(row['image'], row['creator_id'], request),
+    ),
+}
+
+
+class ValuesReader:
+    """
+    builds the representation of a serializer's fields straight from .values() rows, with many
+    to many ids (or slugs, or nested id/name dicts) fetched by one through table query per relation,
+    skipping model instances and DRF's per field dispatch. output matches the serializer,
+    serializers using anything else are reported as not supported
+    """
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.request = serializer.context.get('request')
+        self.columns = {self.model._meta.pk.attname}
+        self.converters = []
+        self.relations = []
+        self.supported = all(self._add_field(name, field) for name, field in serializer.fields.items())
+
+    def _add_field(self, name, field):
+        if name in METHOD_FIELDS and isinstance(field, serializers.SerializerMethodField):
+            columns, method = METHOD_FIELDS[name]
+            self.columns.update(columns)
+            self.converters.append((name, lambda row, related: method(row, self.request)))
+            return True
+        if field.source != name:
+            return False
+
+        model_field = self.model._meta.get_field(name)
+        if model_field.many_to_many:
+            child = getattr(field, 'child_relation', None)
+            if isinstance(field, ManyRelatedField) and isinstance(child, PrimaryKeyRelatedField):
+                self.relations.append((name, 'id'))
+            elif isinstance(field, ManyRelatedField) and isinstance(child, SlugRelatedField):
+                self.relations.append((name, child.slug_field))
+            elif isinstance(field, serializers.ListSerializer) and set(field.child.fields) == {'id', 'name'}:
+                self.relations.append((name, None))
+            else:
+                return False
+            self.converters.append((name, lambda row, related: related[name].get(row['id'], [])))
+            return True
+
+        self.columns.add(name)
+        if isinstance(field, drf_fields.ImageField):
+            storage = model_field.storage
+            request = self.request
+            self.converters.append((name, lambda row, related: (
+                None if not row[name] else
+                request.build_absolute_uri(storage.url(row[name])) if request is not None else storage.url(row[name])
+            )))
+        elif type(field) in PASSTHROUGH_FIELDS:
+            self.converters.append((name, lambda row, related: row[name]))
+        elif isinstance(field, (drf_fields.DecimalField, drf_fields.DateTimeField, drf_fields.FloatField)):
+            self.converters.append((name, lambda row, related: (
+                None if row[name] is None else field.to_representation(row[name])
+            )))
+        else:
+            return False
+        return True
+
+    def values(self, queryset, ordering=()):
+        """the rows to represent, with the columns the ordering of a cursor page needs as well"""
+        ordering = {name.lstrip('-') for name in queryset.query.order_by or ordering}
+        return queryset.prefetch_related(None).values(*self.columns | ordering)
+
+    def _related(self, rows):
+        ids = [row['id'] for row in rows]
+        related = {}
+        for relation, slug_field in self.relations:
+            field = self.model._meta.get_field(relation)
+            source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+            # in id order, like the prefetches of RecipeQuerySet
+            through = field.remote_field.through.objects.filter(**{f'{source}_id__in': ids}).order_by(f'{target}_id')
+            by_id = defaultdict(list)
+            if slug_field is None:
+                for pk, related_pk, name in through.values_list(f'{source}_id', f'{target}_id', f'{target}__name'):
+                    by_id[pk].append({'id': related_pk, 'name': name})
+            else:
+                column = f'{target}_id' if slug_field == 'id' else f'{target}__{slug_field}'
+                for pk, value in through.values_list(f'{source}_id', column):
+                    by_id[pk].append(value)
+            related[relation] = by_id
+        return related
+
+    def represent(self, rows):
+        rows = list(rows)
+        related = self._related(rows) if self.relations else {}
+        converters = self.converters
+        return [{name: convert(row, related) for name, convert in converters} for row in rows]
+
+
+def _rows_after(ordering, row):
+    """filter for the rows following row in ordering"""
+    after, equal = Q(), Q()
+    for name in ordering:
+        column = name.lstrip('-')
+        after |= equal & Q(**{f'{column}__{"lt" if name.startswith("-") else "gt"}': row[column]})
+        equal &= Q(**{column: row[column]})
+    return after
+
+
+def keyset_chunks(queryset, chunk_size):
+    """
+    the rows in lists of chunk_size, each read by its own query continuing after the last row
+    of the previous one. the ordering is completed with the id so it's unique
+    """
+    ordering = list(queryset.query.order_by)
+    if not {'id', '-id'} & set(ordering):
+        ordering.append('id')
+    queryset = queryset.order_by(*ordering)
+    chunk = list(queryset[:chunk_size])
+    while chunk:
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        chunk = list(queryset.filter(_rows_after(ordering, chunk[-1]))[:chunk_size])
+
+
+def represent_chunks(reader, queryset, chunk_size):
+    """
+    represented rows in lists of chunk_size, read through a server side cursor. where those are
+    disabled, e.g. behind pgbouncer, a cursor would fetch every row at once, so rows are read by keyset
+    """
+    if connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        chunks = keyset_chunks(queryset, chunk_size)
+    else:
+        rows = queryset.iterator(chunk_size=chunk_size)
+        chunks = iter(lambda: list(islice(rows, chunk_size)), [])
+    for chunk in chunks:
+        yield reader.represent(chunk)
+
+
+def stream_json(reader, queryset, chunk_size):
+    """
+    the JSON array of the represented rows, rendered chunk by chunk while they are
+    read, so memory doesn't grow with the number of rows
+    """
+    renderer = FastJSONRenderer()
+    yield b'['
+    separator = b''
+    for chunk in represent_chunks(reader, queryset, chunk_size):
+        # the chunk's array without its brackets
+        yield separator + renderer.render(chunk)[1:-1]
+        separator = b','
+    yield b']'
+
+
+class FastListMixin:
+    """
+    list responses built by ValuesReader when FAST_LIST_SERIALIZERS is on and the serializer allows it.
+    unpaginated lists are streamed with ?stream=true
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_LIST_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+        reader = ValuesReader(self.get_serializer())
+        if not reader.supported:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = reader.values(queryset, getattr(self.pagination_class, 'ordering', ()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.represent(page))
+        if request.query_params.get('stream') in ('1', 'true'):
+            return StreamingHttpResponse(
+                stream_json(reader, queryset, settings.LIST_STREAM_CHUNK_SIZE), content_type='application/json'
+            )
+        return Response(reader.represent(queryset))
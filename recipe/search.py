@@ -0,0 +1,107 @@
+import re
+from collections import defaultdict
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, models, transaction
+from django.db.models.functions import Cast, Coalesce
+
+from core.models import Tag, Ingredient, Recipe
+from .cache import get_cache, get_generation
+
+SEARCH_CONFIG = 'english'
+INDEX_KEY = 'recipe-search:index:{user_id}:{generation}'
+TOKEN_RE = re.compile(r'\w+')
+# weights of the fallback index, matching the A/B weights of the tsvector
+TITLE_WEIGHT = 1.0
+RELATED_WEIGHT = 0.4
+
+
+def uses_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def _related_names(model):
+    names = model.objects.filter(recipe=models.OuterRef('pk')).values('recipe').annotate(
+        names=StringAgg('name', ' ')
+    ).values('names')
+    return Coalesce(models.Subquery(names), models.Value(''), output_field=models.TextField())
+
+
+def update_search_vectors(**filters):
+    """recompute the stored tsvector of the filtered recipes from their title, tags and ingredients"""
+    if not uses_postgres():
+        return
+    Recipe.objects.filter(**filters).update(search_vector=(
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(_related_names(Tag), weight='B', config=SEARCH_CONFIG)
+        + SearchVector(_related_names(Ingredient), weight='B', config=SEARCH_CONFIG)
+    ))
+
+
+def schedule_search_update(**filters):
+    """refresh search vectors once the writes that changed them are committed, with one UPDATE"""
+    if uses_postgres():
+        transaction.on_commit(lambda: update_search_vectors(**filters))
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def build_index(user_id):
+    """inverted index of term -> {recipe id: score} over a user's recipes"""
+    index = defaultdict(lambda: defaultdict(float))
+    recipes = Recipe.objects.filter(creator_id=user_id)
+    for recipe_id, title in recipes.values_list('id', 'title').iterator():
+        for term in tokenize(title):
+            index[term][recipe_id] += TITLE_WEIGHT
+    for relation in ('tags', 'ingredients'):
+        names = recipes.filter(**{f'{relation}__isnull': False}).values_list('id', f'{relation}__name')
+        for recipe_id, name in names.iterator():
+            for term in tokenize(name):
+                index[term][recipe_id] += RELATED_WEIGHT
+    return {term: dict(postings) for term, postings in index.items()}
+
+
+def get_index(user_id):
+    """the fallback index is rebuilt only when the user's cache generation changes"""
+    cache = get_cache()
+    key = INDEX_KEY.format(user_id=user_id, generation=get_generation(user_id))
+    index = cache.get(key)
+    if index is None:
+        index = build_index(user_id)
+        cache.set(key, index)
+    return index
+
+
+def search_recipes(queryset, query, user_id):
+    """
+    keep recipes matching every term of the query, annotated with search_rank.
+    postgres uses the GIN indexed tsvector, other databases a cached in-process inverted index
+    """
+    if uses_postgres():
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        # ts_rank is a real, as a double it survives the round trip through pagination cursors exactly
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=Cast(SearchRank(models.F('search_vector'), search_query), models.FloatField())
+        )
+
+    no_match = queryset.none().annotate(search_rank=models.Value(0.0, output_field=models.FloatField()))
+    terms = tokenize(query)
+    if not terms:
+        return no_match
+    index = get_index(user_id)
+    scores = None
+    for term in terms:
+        postings = index.get(term, {})
+        if scores is None:
+            scores = dict(postings)
+        else:
+            scores = {pk: score + postings[pk] for pk, score in scores.items() if pk in postings}
+    if not scores:
+        return no_match
+    return queryset.filter(pk__in=scores).annotate(search_rank=models.Case(
+        *[models.When(pk=pk, then=models.Value(score)) for pk, score in scores.items()],
+        output_field=models.FloatField(),
+    ))
@@ -1,6 +1,10 @@
+from decimal import Decimal
+
+from django.conf import settings
 from rest_framework import serializers
 
 from core.models import Tag, Ingredient, Recipe
+from .images import variant_urls
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -17,13 +21,69 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = 'id',
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class ResolveNamesSerializer(serializers.Serializer):
+    """Serializer for resolving many tag or ingredient names to ids at once"""
+    names = serializers.ListField(
+        child=serializers.CharField(max_length=256), allow_empty=False, max_length=1000
+    )
+
+    def validate_names(self, value):
+        """names are stored lowercased, so normalize and de-duplicate them once here"""
+        return list(dict.fromkeys(name.lower() for name in value))
+
+
+class RecipeFilterSerializer(serializers.Serializer):
+    """Serializer validating the range filter and ordering query params of the recipe list"""
+    ORDERINGS = {
+        'price': ('price', 'id'),
+        '-price': ('-price', '-id'),
+        'time_minutes': ('time_minutes', 'id'),
+        '-time_minutes': ('-time_minutes', '-id'),
+    }
+
+    # bounds are compared, never stored, so any non-negative amount is accepted, not just a storable price
+    min_price = serializers.DecimalField(max_digits=None, decimal_places=None, min_value=Decimal(0), required=False)
+    max_price = serializers.DecimalField(max_digits=None, decimal_places=None, min_value=Decimal(0), required=False)
+    max_time = serializers.IntegerField(min_value=0, required=False)
+    ordering = serializers.ChoiceField(choices=list(ORDERINGS), required=False)
+
+    def validate(self, attrs):
+        if attrs.get('min_price') is not None and attrs.get('max_price') is not None \
+                and attrs['min_price'] > attrs['max_price']:
+            raise serializers.ValidationError({'min_price': 'must not be greater than max_price'})
+        return attrs
+
+
+class SparseFieldsMixin:
+    """
+    keeps only the fields passed as `fields` (every field when None) and nests
+    the tags/ingredients named in `expand` instead of listing their ids
+    """
+    expandable = {'tags': TagSerializer, 'ingredients': IngredientSerializer}
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in expand:
+            self.fields[name] = self.expandable[name](many=True, read_only=True)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ImageVariantsMixin(serializers.Serializer):
+    image_variants = serializers.SerializerMethodField()
+
+    def get_image_variants(self, recipe):
+        return variant_urls(recipe, self.context.get('request'))
+
+
+class RecipeSerializer(SparseFieldsMixin, ImageVariantsMixin, serializers.ModelSerializer):
     ingredients = serializers.PrimaryKeyRelatedField(many=True, queryset=Ingredient.objects.all())
     tags = serializers.PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
 
     class Meta:
         model = Recipe
-        exclude = 'creator',
+        exclude = 'creator', 'search_vector'
         read_only_fields = 'id',
 
 
@@ -32,9 +92,73 @@ class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     """Serializer for  uploading images to recipes"""
     class Meta:
         model = Recipe
-        fields = 'id', 'image'
-        read_only_fields = 'id',
\ No newline at end of file
+        fields = 'id', 'image', 'image_variants'
+        read_only_fields = 'id',
+
+    def validate_image(self, value):
+        """dimensions come from the lazily opened header, pixel data is never decoded here"""
+        width, height = value.image.size
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            raise serializers.ValidationError(
+                f'Images may have at most {settings.RECIPE_IMAGE_MAX_PIXELS} pixels.'
+            )
+        return value
+
+
+class RecipeBulkSerializer(serializers.ModelSerializer):
+    """
+    Serializer for one item of a bulk write, related ids are checked against
+    the sets of existing ids the view loads once for the whole request
+    """
+    id = serializers.IntegerField(required=False)
+    tags = serializers.ListField(child=serializers.IntegerField(), required=False)
+    ingredients = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    class Meta:
+        model = Recipe
+        fields = 'id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients'
+
+    def _validate_related(self, value, existing_ids):
+        missing = set(value) - existing_ids
+        if missing:
+            raise serializers.ValidationError(f'Invalid pk(s) {sorted(missing)} - object does not exist.')
+        return list(dict.fromkeys(value))
+
+    def validate_tags(self, value):
+        return self._validate_related(value, self.context['tag_ids'])
+
+    def validate_ingredients(self, value):
+        return self._validate_related(value, self.context['ingredient_ids'])
+
+
+class RecipeExportSerializer(serializers.ModelSerializer):
+    """Serializer for exported recipes, tags and ingredients are referenced by name"""
+    tags = serializers.SlugRelatedField(many=True, slug_field='name', read_only=True)
+    ingredients = serializers.SlugRelatedField(many=True, slug_field='name', read_only=True)
+
+    class Meta:
+        model = Recipe
+        fields = 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients'
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """Serializer for one imported recipe, unknown tag and ingredient names are created"""
+    tags = serializers.ListField(child=serializers.CharField(max_length=256), required=False, default=list)
+    ingredients = serializers.ListField(child=serializers.CharField(max_length=256), required=False, default=list)
+
+    class Meta:
+        model = Recipe
+        fields = 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients'
+
+    def _normalize_names(self, value):
+        return list(dict.fromkeys(name.lower() for name in value))
+
+    def validate_tags(self, value):
+        return self._normalize_names(value)
+
+    def validate_ingredients(self, value):
+        return self._normalize_names(value)
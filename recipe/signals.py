@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+from .cache import bump_generation
+from .images import release_image
+from .search import uses_postgres, schedule_search_update
+
+User = get_user_model()
+
+RELATION_NAMES = {Tag: 'tags', Ingredient: 'ingredients'}
+
+
+def invalidate(*user_ids):
+    """bump now and again on commit, so readers can't cache rows of a transaction in flight"""
+    bump_generation(*user_ids)
+    transaction.on_commit(lambda: bump_generation(*user_ids))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_creator(sender, instance, **kwargs):
+    invalidate(instance.creator_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_image(sender, instance, **kwargs):
+    release_image(instance.image.name)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def invalidate_recipe_creators(sender, instance, created=False, **kwargs):
+    """renaming or deleting a tag or ingredient changes the recipes of everyone who used it"""
+    if created:
+        return
+    invalidate(*instance.recipe_set.values_list('creator_id', flat=True).distinct())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_related(sender, instance, action, model, pk_set, **kwargs):
+    """recipes and the assigned_only lists of their tags/ingredients' creators change together"""
+    if action in ('post_add', 'post_remove'):
+        creator_ids = model.objects.filter(pk__in=pk_set).values_list('creator_id', flat=True)
+    elif action == 'pre_clear':
+        creator_ids = sender.objects.filter(**{instance._meta.model_name: instance}).values_list(
+            f'{model._meta.model_name}__creator_id', flat=True
+        )
+    else:
+        return
+    invalidate(instance.creator_id, *creator_ids.distinct())
+
+
+@receiver(pre_delete, sender=Recipe)
+def invalidate_related_on_delete(sender, instance, **kwargs):
+    """
+    deleting a recipe removes its through rows by cascade, which sends no m2m_changed, so the
+    creators of its tags and ingredients are invalidated here, in one query
+    """
+    tags = Tag.objects.filter(recipe=instance).values_list('creator_id', flat=True)
+    ingredients = Ingredient.objects.filter(recipe=instance).values_list('creator_id', flat=True)
+    creator_ids = set(tags.union(ingredients))
+    if creator_ids:
+        invalidate(*creator_ids)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'title' in update_fields:
+        schedule_search_update(pk=instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def update_related_search(sender, instance, created=False, **kwargs):
+    """names of tags and ingredients are part of the search vector of every recipe using them"""
+    if created or not uses_postgres():
+        return
+    if kwargs['signal'] is pre_delete:
+        # the through rows are gone by the time the deletion commits
+        schedule_search_update(pk__in=list(instance.recipe_set.values_list('pk', flat=True)))
+    else:
+        schedule_search_update(**{RELATION_NAMES[sender]: instance})
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_assigned_search(sender, instance, action, reverse, pk_set, **kwargs):
+    if not uses_postgres():
+        return
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        schedule_search_update(pk=instance.pk)
+    elif reverse and action in ('post_add', 'post_remove'):
+        schedule_search_update(pk__in=set(pk_set))
+    elif reverse and action == 'pre_clear':
+        schedule_search_update(pk__in=list(instance.recipe_set.values_list('pk', flat=True)))
@@ -0,0 +1,107 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import accumulate
+
+from django.conf import settings
+
+from core.db.routers import reads_from_primary
+from .cache import get_generation
+
+
+class NameIndex:
+    """
+    a user's names sorted once, so every prefix is a contiguous run found by binary search.
+    the names are kept as one string with their offsets and the ids as an array, a fraction of
+    the memory of a str and an int object per name. without rows it only remembers that the user
+    has too many names to keep in process
+    """
+
+    def __init__(self, generation, rows=None):
+        self.generation = generation
+        self.text = self.offsets = self.ids = None
+        if rows is not None:
+            # code point order, which database collations don't necessarily follow
+            rows = sorted(rows)
+            self.text = ''.join(name for name, _ in rows)
+            self.offsets = array('I', accumulate((len(name) for name, _ in rows), initial=0))
+            self.ids = array('q', (pk for _, pk in rows))
+
+    def __len__(self):
+        return 0 if self.ids is None else len(self.ids)
+
+    def __getitem__(self, i):
+        return self.text[self.offsets[i]:self.offsets[i + 1]]
+
+    def match(self, prefix, limit):
+        start = bisect_left(self, prefix)
+        matches = []
+        for i in range(start, min(start + limit, len(self))):
+            name = self[i]
+            if not name.startswith(prefix):
+                break
+            matches.append({'id': self.ids[i], 'name': name})
+        return matches
+
+
+class LocalNameIndexes:
+    """in-process LRU of (model, user id) -> NameIndex, bounded by users and by the names they hold"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._names = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, generation):
+        with self._lock:
+            index = self._entries.get(key)
+            if index is None or index.generation != generation:
+                return None
+            self._entries.move_to_end(key)
+            return index
+
+    def set(self, key, index):
+        with self._lock:
+            replaced = self._entries.pop(key, None)
+            if replaced is not None:
+                self._names -= len(replaced)
+            self._entries[key] = index
+            self._names += len(index)
+            while self._entries and (len(self._entries) > settings.SUGGEST_CACHE_MAX_USERS
+                                     or self._names > settings.SUGGEST_CACHE_MAX_TOTAL_NAMES):
+                _, evicted = self._entries.popitem(last=False)
+                self._names -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._names = 0
+
+
+local_indexes = LocalNameIndexes()
+
+
+def suggest_names(queryset, user_id, prefix, limit):
+    """
+    the first names of the user starting with prefix in alphabetical order. names are served from
+    a cached sorted index until the user's cache generation changes, users with more names than
+    are worth caching are answered by the database, where a trigram index serves the LIKE
+    """
+    prefix = prefix.lower()
+    key = queryset.model._meta.label, user_id
+    generation = get_generation(user_id)
+    queryset = queryset.filter(creator_id=user_id).order_by('name')
+    index = local_indexes.get(key, generation)
+    if index is None:
+        # kept until the user's generation changes, so never read from a replica that may lag behind it
+        with reads_from_primary():
+            rows = list(queryset.order_by().values_list('name', 'id')[:settings.SUGGEST_CACHE_MAX_NAMES + 1])
+        index = NameIndex(generation, rows if len(rows) <= settings.SUGGEST_CACHE_MAX_NAMES else None)
+        local_indexes.set(key, index)
+    if index.ids is not None:
+        return index.match(prefix, limit)
+    return [
+        {'id': pk, 'name': name}
+        for name, pk in queryset.filter(name__startswith=prefix).values_list('name', 'id')[:limit]
+    ]
@@ -0,0 +1,188 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.checks import check_recipe_cache
+from core.models import Recipe, Tag
+
+User = get_user_model()
+RECIPE_URL = reverse('recipe:recipes-list')
+TAG_URL = reverse('recipe:tags-list')
+
+
+def recipe_detail_url(pk):
+    """return recipe detail url"""
+    return reverse('recipe:recipes-detail', args=[pk])
+
+
+class ListCacheTests(APITestCase):
+    """list responses are cached per user and invalidated on writes"""
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        self.user2 = User.objects.create_user(email='asdf@asdf.com', password='hiwa_asdf')
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(creator=self.user, title='soup', time_minutes=5, price=2.00)
+
+    def test_repeated_list_is_served_from_cache(self):
+        response = self.client.get(RECIPE_URL)
+        with self.assertNumQueries(0):
+            cached = self.client.get(RECIPE_URL)
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data, response.data)
+
+    def test_query_params_are_cached_separately(self):
+        self.client.get(RECIPE_URL)
+        response = self.client.get(RECIPE_URL, {'page_size': 1})
+        self.assertIn('results', response.data)
+
+    def test_users_have_separate_caches(self):
+        self.client.get(RECIPE_URL)
+        self.client.force_authenticate(self.user2)
+        response = self.client.get(RECIPE_URL)
+        self.assertEqual(response.data, [])
+
+    def test_create_update_delete_invalidate(self):
+        self.client.get(RECIPE_URL)
+        self.client.post(RECIPE_URL, {'title': 'stew', 'time_minutes': 50, 'price': 9.00})
+        response = self.client.get(RECIPE_URL)
+        self.assertEqual(len(response.data), 2)
+
+        self.client.patch(recipe_detail_url(self.recipe.id), {'title': 'hot soup'})
+        response = self.client.get(RECIPE_URL)
+        self.assertIn('hot soup', [item['title'] for item in response.data])
+
+        self.client.delete(recipe_detail_url(self.recipe.id))
+        response = self.client.get(RECIPE_URL)
+        self.assertEqual(len(response.data), 1)
+
+    def test_m2m_changes_invalidate_tag_creator(self):
+        """using another user's tag changes that user's assigned_only list"""
+        tag = Tag.objects.create(creator=self.user2, name='shared')
+        self.client.force_authenticate(self.user2)
+        response = self.client.get(TAG_URL, {'assigned_only': 1})
+        self.assertEqual(response.data, [])
+
+        self.recipe.tags.add(tag)
+        response = self.client.get(TAG_URL, {'assigned_only': 1})
+        self.assertEqual([item['id'] for item in response.data], [tag.id])
+
+        self.recipe.tags.clear()
+        response = self.client.get(TAG_URL, {'assigned_only': 1})
+        self.assertEqual(response.data, [])
+
+    def test_deleting_recipe_invalidates_tag_creator(self):
+        """a recipe's through rows are deleted by cascade, which sends no m2m_changed"""
+        tag = Tag.objects.create(creator=self.user2, name='shared')
+        recipe = Recipe.objects.create(creator=self.user, title='stew', time_minutes=5, price=2.00)
+        self.recipe.tags.add(tag)
+        recipe.tags.add(tag)
+        self.client.force_authenticate(self.user2)
+        response = self.client.get(TAG_URL, {'assigned_only': 1})
+        etag = response['ETag']
+        self.assertEqual([item['id'] for item in response.data], [tag.id])
+
+        self.client.force_authenticate(self.user)
+        self.client.delete(recipe_detail_url(self.recipe.id))
+        self.client.force_authenticate(self.user2)
+        response = self.client.get(TAG_URL, {'assigned_only': 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data], [tag.id])
+
+        self.client.force_authenticate(self.user)
+        self.client.delete(reverse('recipe:recipes-bulk'), {'ids': [recipe.id]}, format='json')
+        self.client.force_authenticate(self.user2)
+        response = self.client.get(TAG_URL, {'assigned_only': 1}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_deleting_tag_invalidates_recipes_using_it(self):
+        tag = Tag.objects.create(creator=self.user2, name='shared')
+        self.recipe.tags.add(tag)
+        response = self.client.get(RECIPE_URL)
+        self.assertEqual(response.data[0]['tags'], [tag.id])
+
+        tag.delete()
+        response = self.client.get(RECIPE_URL)
+        self.assertEqual(response.data[0]['tags'], [])
+
+
+class ConditionalGetTests(APITestCase):
+    """list and detail views answer If-None-Match from the user's version stamp"""
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(creator=self.user, title='soup', time_minutes=5, price=2.00)
+
+    def test_unchanged_list_is_not_modified(self):
+        etag = self.client.get(RECIPE_URL)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etags_differ_per_url(self):
+        etag = self.client.get(RECIPE_URL)['ETag']
+        response = self.client.get(recipe_detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(TAG_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_changes_produce_new_etag(self):
+        etag = self.client.get(recipe_detail_url(self.recipe.id))['ETag']
+        tag = Tag.objects.create(creator=self.user, name='soups')
+        self.recipe.tags.add(tag)
+        response = self.client.get(recipe_detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['tags'][0]['name'], 'soups')
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class ReplicaCacheTests(APITestCase):
+    """nothing read from a replica, which may lag behind the user's generation, is kept"""
+    def setUp(self) -> None:
+        # no pins to the primary left from other tests
+        cache.clear()
+        self.user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(creator=self.user, title='soup', time_minutes=5, price=2.00)
+
+    def test_cached_lists_are_read_from_primary(self):
+        # replica_0 isn't a configured database, reading from it would fail
+        response = self.client.get(RECIPE_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', response)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                             status.HTTP_304_NOT_MODIFIED)
+
+    def test_suggest_indexes_are_read_from_primary(self):
+        Tag.objects.create(creator=self.user, name='soups')
+        response = self.client.get(reverse('recipe:tags-suggest'), {'q': 'so'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag['name'] for tag in response.data], ['soups'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_validators_for_replica_reads(self):
+        with patch('recipe.cache.read_from_replica', return_value=True):
+            response = self.client.get(recipe_detail_url(self.recipe.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+
+class RecipeCacheCheckTests(SimpleTestCase):
+    """generations have to be kept in a cache shared between workers"""
+
+    def test_process_local_cache(self):
+        self.assertEqual([error.id for error in check_recipe_cache(None)], ['core.E002'])
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache', 'LOCATION': 'cache:11211'},
+    })
+    def test_shared_cache(self):
+        self.assertEqual(check_recipe_cache(None), [])
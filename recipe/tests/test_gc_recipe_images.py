@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.models import Recipe
+from recipe.images import variant_name
+from recipe.management.commands.gc_recipe_images import Command
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class GcRecipeImagesTests(TestCase):
+    """orphaned blobs and variants are removed, referenced ones are kept"""
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self) -> None:
+        user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        self.recipe = Recipe.objects.create(creator=user, title='soup', time_minutes=5, price=2.00)
+        self.recipe.image.save('kept.jpg', ContentFile(b'kept image'))
+        storage = Recipe.image.field.storage
+        self.orphan = storage.save('uploads/recipe/orphan.jpg', ContentFile(b'orphaned image'))
+        self.orphan_variant = variant_name(self.orphan, 128)
+        self.kept_variant = variant_name(self.recipe.image.name, 128)
+        for name in (self.orphan_variant, self.kept_variant):
+            default_storage.save(name, ContentFile(b'variant'))
+        self.storage = storage
+
+    def gc(self, *args, grace_seconds=0):
+        out = StringIO()
+        call_command('gc_recipe_images', '--grace-seconds', str(grace_seconds), *args, stdout=out)
+        return out.getvalue()
+
+    def test_orphans_are_deleted(self):
+        output = self.gc()
+        self.assertIn(f'orphaned {self.orphan}', output)
+        self.assertFalse(self.storage.exists(self.orphan))
+        self.assertFalse(os.path.exists(self.storage.path(self.orphan_variant)))
+        self.assertTrue(self.storage.exists(self.recipe.image.name))
+        self.assertTrue(os.path.exists(self.storage.path(self.kept_variant)))
+
+    def test_dry_run_keeps_files(self):
+        output = self.gc('--dry-run')
+        self.assertIn('Would delete', output)
+        self.assertTrue(self.storage.exists(self.orphan))
+
+    def test_recent_files_are_kept(self):
+        call_command('gc_recipe_images', stdout=StringIO())
+        self.assertTrue(self.storage.exists(self.orphan))
+
+    def test_blobs_touched_after_listing_are_kept(self):
+        """a blob an upload deduplicated into while its batch was pending isn't deleted"""
+        stale = time.time() - 60
+        os.utime(self.storage.path(self.orphan), (stale, stale))
+        collect = Command.collect
+
+        def upload_then_collect(command, batch):
+            # the same content uploaded again, between listing the blob and deleting it
+            self.assertEqual(self.storage.save('uploads/recipe/again.jpg', ContentFile(b'orphaned image')), self.orphan)
+            collect(command, batch)
+        with patch.object(Command, 'collect', upload_then_collect):
+            self.gc(grace_seconds=30)
+        self.assertTrue(self.storage.exists(self.orphan))
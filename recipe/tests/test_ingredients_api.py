@@ -1,9 +1,12 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from core.models import Ingredient, Recipe
+from recipe.bulk import RESOLVE_ATTEMPTS
 from recipe.serializers import IngredientSerializer
 
 User = get_user_model()
@@ -65,3 +68,41 @@ class PrivateIngredientApiTests(APITestCase):
         serializer2 = IngredientSerializer(ingredient2)
         self.assertIn(serializer1.data, response.data)
         self.assertNotIn(serializer2.data, response.data)
+
+    def test_resolve_ingredient_names(self):
+        """existing names are reused, missing ones are created, in two queries"""
+        url = reverse('recipe:ingredients-resolve')
+        names = ['Salt', 'sugar', 'pepper', 'SUGAR', 'flour']
+        with self.assertNumQueries(2):
+            response = self.client.post(url, {'names': names}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in response.data], ['salt', 'sugar', 'pepper', 'flour'])
+        self.assertEqual(response.data[0]['id'], self.ingredient1.id)
+        self.assertEqual(response.data[2]['id'], self.ingredient2.id)
+        self.assertEqual(Ingredient.objects.get(name='flour').creator, self.user2)
+        self.assertEqual(Ingredient.objects.filter(name='sugar').count(), 1)
+
+    def test_resolve_invalid_names(self):
+        url = reverse('recipe:ingredients-resolve')
+        for payload in ({'names': []}, {'names': ['x' * 300]}, {}):
+            response = self.client.post(url, payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_resolve_names_deleted_meanwhile(self):
+        """a name deleted between its insert and the select is inserted again"""
+        url = reverse('recipe:ingredients-resolve')
+        bulk_create = Ingredient.objects.bulk_create
+
+        def delete_after_insert(objects, **kwargs):
+            bulk_create(objects, **kwargs)
+            if deletions:
+                Ingredient.objects.filter(name__in=deletions.pop()).delete()
+        deletions = [['salt', 'flour']]
+        with patch.object(Ingredient.objects, 'bulk_create', side_effect=delete_after_insert):
+            response = self.client.post(url, {'names': ['salt', 'flour', 'sugar']}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([item['name'] for item in response.data], ['salt', 'flour', 'sugar'])
+
+            deletions = [['flour']] * RESOLVE_ATTEMPTS
+            response = self.client.post(url, {'names': ['flour']}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
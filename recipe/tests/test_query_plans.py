@@ -0,0 +1,132 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.search import update_search_vectors
+from recipe.views import RecipeViewSet, TagsViewSet, IngredientsViewSet
+
+User = get_user_model()
+factory = APIRequestFactory()
+USERS = 50
+RECIPES_PER_USER = 1000
+PAGE_SIZE = 20
+USER_NAMES = 2000
+
+
+def view_queryset(viewset_class, user, params=None, action='list'):
+    """return the queryset a viewset would read for the given query params, lists a page of PAGE_SIZE"""
+    request = Request(factory.get('/', {'page_size': PAGE_SIZE, **(params or {})}))
+    request.user = user
+    view = viewset_class(request=request, action=action, format_kwarg=None, kwargs={})
+    queryset = view.get_queryset()
+    if action == 'list':
+        # the first page, as the cursor paginator reads it
+        ordering = view.paginator.get_ordering(request, queryset, view)
+        queryset = queryset.order_by(*ordering)[:view.paginator.get_page_size(request) + 1]
+    return queryset
+
+
+def fk_index(model, field_name):
+    """the name of the index django created for a foreign key, which depends on the table's past names"""
+    field = model._meta.get_field(field_name)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT indexname FROM pg_indexes WHERE tablename = %s AND indexdef LIKE %s',
+            [model._meta.db_table, f'% USING btree ({field.column})'],
+        )
+        return cursor.fetchone()[0]
+
+
+@skipUnless(connection.vendor == 'postgresql', 'query plans are only checked against postgres')
+class QueryPlanTests(TestCase):
+    """endpoints must be answered through the indexes meant for them, never with a sequential scan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # planners only prefer indexes over scanning tables of realistic size, so the user's rows are a
+        # small part of tables shared with many other users
+        users = [User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')] + [
+            User(email=f'user{i}@asdf.com', password='!') for i in range(USERS - 1)
+        ]
+        cls.user = users[0]
+        users[1:] = User.objects.bulk_create(users[1:])
+        for creator in users:
+            # the user keeps a large pantry, whose names can't be sorted as cheaply as a few
+            names = USER_NAMES if creator == cls.user else 50
+            tags = Tag.objects.bulk_create(Tag(creator=creator, name=f'{creator.id} tag {i}') for i in range(names))
+            ingredients = Ingredient.objects.bulk_create(
+                Ingredient(creator=creator, name=f'{creator.id} ingredient {i}') for i in range(names)
+            )
+            recipes = Recipe.objects.bulk_create(
+                Recipe(creator=creator, title=f'recipe {i}', time_minutes=i % 120, price=i % 40 + 0.5)
+                for i in range(RECIPES_PER_USER)
+            )
+            Recipe.tags.through.objects.bulk_create(
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tags[i % 50].id)
+                for i, recipe in enumerate(recipes)
+            )
+            Recipe.ingredients.through.objects.bulk_create(
+                Recipe.ingredients.through(recipe_id=recipe.id, ingredient_id=ingredients[i % 50].id)
+                for i, recipe in enumerate(recipes)
+            )
+            if creator == cls.user:
+                cls.tag, cls.ingredient = tags[0], ingredients[0]
+        update_search_vectors(creator__isnull=False)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.user_recipes = fk_index(Recipe, 'creator')
+        cls.tag_recipes = fk_index(Recipe.tags.through, 'tag')
+        cls.ingredient_recipes = fk_index(Recipe.ingredients.through, 'ingredient')
+
+    def assertUsesIndex(self, queryset, *indexes):
+        """the plan postgres picks for queryset reads through each of indexes"""
+        plan = queryset.explain()
+        for index in indexes:
+            self.assertRegex(plan, rf'Index (Only )?Scan (Backward )?using {index} ', msg=plan)
+        self.assertNotIn('Seq Scan', plan, msg=plan)
+
+    def test_recipe_list_plan(self):
+        self.assertUsesIndex(view_queryset(RecipeViewSet, self.user), 'recipe_creator_id_idx')
+
+    def test_recipe_filter_plans(self):
+        tag_id, ingredient_id = self.tag.id, self.ingredient.id
+        self.assertUsesIndex(view_queryset(RecipeViewSet, self.user, {'tags': f'{tag_id}'}), self.tag_recipes)
+        self.assertUsesIndex(
+            view_queryset(RecipeViewSet, self.user, {'ingredients': f'{ingredient_id}'}), self.ingredient_recipes
+        )
+        self.assertUsesIndex(view_queryset(
+            RecipeViewSet, self.user, {'tags': f'{tag_id}', 'ingredients': f'{ingredient_id}'}
+        ), self.tag_recipes, self.ingredient_recipes, 'core_recipe_pkey')
+
+    def test_recipe_range_filter_plans(self):
+        for params, index in (
+            ({'ordering': '-price'}, 'recipe_creator_price_idx'),
+            ({'min_price': '1', 'max_price': '6', 'ordering': 'price'}, 'recipe_creator_price_idx'),
+            ({'max_time': 10, 'ordering': 'time_minutes'}, 'recipe_creator_time_idx'),
+            # a page of the user's few matching recipes is sorted after reading them all
+            ({'max_time': 10}, self.user_recipes),
+        ):
+            self.assertUsesIndex(view_queryset(RecipeViewSet, self.user, params), index)
+
+    def test_recipe_detail_plan(self):
+        recipe = Recipe.objects.filter(creator=self.user).first()
+        queryset = view_queryset(RecipeViewSet, self.user, action='retrieve').filter(pk=recipe.pk)
+        self.assertUsesIndex(queryset, 'core_recipe_pkey')
+
+    def test_recipe_search_plan(self):
+        # the user's recipes are few enough to match them all, rather than every user's matches
+        self.assertUsesIndex(view_queryset(RecipeViewSet, self.user, {'search': 'recipe 7'}), self.user_recipes)
+
+    def test_tag_and_ingredient_list_plans(self):
+        for viewset_class, model in ((TagsViewSet, Tag), (IngredientsViewSet, Ingredient)):
+            # (creator, -name, id) reads a page in the paginator's order, without sorting the user's names
+            index = f'{model._meta.model_name}_creator_name_idx'
+            self.assertUsesIndex(view_queryset(viewset_class, self.user), index)
+            self.assertUsesIndex(view_queryset(viewset_class, self.user, {'assigned_only': 1}), index)
+            plan = view_queryset(viewset_class, self.user).explain()
+            self.assertNotIn('Sort', plan, msg=plan)
@@ -0,0 +1,118 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import serializers
+from rest_framework.test import APITestCase
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import get_cache
+from recipe.readers import ValuesReader
+from recipe.serializers import RecipeSerializer
+
+User = get_user_model()
+RECIPE_URL = reverse('recipe:recipes-list')
+TAG_URL = reverse('recipe:tags-list')
+INGREDIENT_URL = reverse('recipe:ingredients-list')
+
+
+class ValuesReaderParityTests(APITestCase):
+    """list responses built from .values() rows must match the serializers exactly"""
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        self.client.force_authenticate(self.user)
+        tags = [Tag.objects.create(name=f'tag {i}', creator=self.user) for i in range(3)]
+        ingredients = [Ingredient.objects.create(name=f'ingredient {i}', creator=self.user) for i in range(3)]
+        for i in range(6):
+            recipe = Recipe.objects.create(
+                creator=self.user, title=f'curry {i}', time_minutes=10 + i % 3, price=f'{i}.5', link=f'l{i}'
+            )
+            recipe.tags.add(*tags[:i % 4])
+            recipe.ingredients.add(*ingredients[i % 2:])
+        Recipe.objects.filter(title='curry 1').update(image='uploads/recipe/parity.jpg')
+
+    def get_both(self, url, params):
+        responses = []
+        for fast in (False, True):
+            # each path has to build the response itself
+            get_cache().clear()
+            with override_settings(FAST_LIST_SERIALIZERS=fast):
+                responses.append(self.client.get(url, params))
+        return responses
+
+    def assertParity(self, url, params=None):
+        slow, fast = self.get_both(url, params or {})
+        self.assertEqual(slow.status_code, 200, slow.data)
+        self.assertEqual(fast.content, slow.content, params)
+        return fast
+
+    def test_recipe_list_parity(self):
+        response = self.assertParity(RECIPE_URL)
+        self.assertEqual(len(response.data), 6)
+
+    def test_recipe_list_params_parity(self):
+        params_list = (
+            {'fields': 'id,title,image'},
+            {'fields': 'image_variants,price'},
+            {'expand': 'tags'},
+            {'expand': 'tags,ingredients', 'fields': 'id,tags,ingredients'},
+            {'ordering': '-price', 'max_time': 11},
+            {'search': 'curry', 'page_size': 4},
+            {'tags': '1,2', 'match': 'all'},
+        )
+        for params in params_list:
+            self.assertParity(RECIPE_URL, params)
+
+    def test_recipe_list_pages_parity(self):
+        slow, fast = self.get_both(RECIPE_URL, {'page_size': 4, 'ordering': 'time_minutes'})
+        self.assertEqual(fast.content, slow.content)
+        slow, fast = self.get_both(fast.data['next'], {})
+        self.assertEqual(fast.content, slow.content)
+
+    def test_tag_and_ingredient_list_parity(self):
+        for url in (TAG_URL, INGREDIENT_URL):
+            self.assertParity(url)
+            self.assertParity(url, {'assigned_only': 1})
+            self.assertParity(url, {'page_size': 2})
+
+    def test_streamed_list_matches_response(self):
+        response = self.assertParity(RECIPE_URL, {'ordering': 'price'})
+        for chunk_size in (1, 4, 100):
+            with override_settings(LIST_STREAM_CHUNK_SIZE=chunk_size):
+                streamed = self.client.get(RECIPE_URL, {'ordering': 'price', 'stream': 'true'})
+            self.assertTrue(streamed.streaming)
+            self.assertEqual(streamed['Content-Type'], 'application/json')
+            self.assertEqual(b''.join(streamed.streaming_content), response.content)
+
+    def test_streamed_list_without_server_side_cursors(self):
+        """behind pgbouncer rows are read by keyset, in the same order, ties included"""
+        params_list = {'ordering': '-price'}, {'ordering': '-time_minutes'}, {'search': 'curry'}
+        for url, params in [(RECIPE_URL, params) for params in params_list] + [(TAG_URL, {})]:
+            response = self.client.get(url, params)
+            for chunk_size in (1, 4):
+                with override_settings(LIST_STREAM_CHUNK_SIZE=chunk_size), \
+                        patch.dict(connection.settings_dict, {'DISABLE_SERVER_SIDE_CURSORS': True}):
+                    streamed = self.client.get(url, {**params, 'stream': 'true'})
+                    content = b''.join(streamed.streaming_content)
+                self.assertEqual(content, response.content, params)
+
+    def test_streamed_empty_list(self):
+        self.client.force_authenticate(User.objects.create_user(email='new@gmail.com', password='hiwa_asdf'))
+        streamed = self.client.get(TAG_URL, {'stream': 'true'})
+        self.assertEqual(b''.join(streamed.streaming_content), b'[]')
+
+    def test_paginated_lists_are_not_streamed(self):
+        response = self.client.get(RECIPE_URL, {'stream': 'true', 'page_size': 2})
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_unsupported_serializer(self):
+        """fields not backed by a column of the same name are left to the serializer"""
+        self.assertTrue(ValuesReader(RecipeSerializer()).supported)
+        self.assertFalse(ValuesReader(RenamedTitleSerializer()).supported)
+
+
+class RenamedTitleSerializer(RecipeSerializer):
+    name = serializers.CharField(source='title')
@@ -70,6 +70,32 @@ class PrivateRecipeApiTest(APITestCase):
         self.assertEqual(response.data, serializer.data)
         self.assertEqual(len(response.data), 2)
 
+    def test_recipe_list_cursor_pagination(self):
+        """paging through recipes with a page_size returns every recipe once"""
+        recipes = [sample_recipe(self.user, title=f'recipe {i}') for i in range(5)]
+        sample_recipe(self.user2)
+        response = self.client.get(RECIPE_URL, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['previous'])
+        ids = [item['id'] for item in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids.extend(item['id'] for item in response.data['results'])
+        self.assertEqual(ids, [recipe.id for recipe in recipes])
+
+    def test_recipe_list_cursor_stable_under_inserts(self):
+        """recipes created between pages don't shift or repeat items"""
+        recipes = [sample_recipe(self.user, title=f'recipe {i}') for i in range(4)]
+        response = self.client.get(RECIPE_URL, {'page_size': 2})
+        first_page = [item['id'] for item in response.data['results']]
+        new_recipe = sample_recipe(self.user, title='late recipe')
+        response = self.client.get(response.data['next'])
+        second_page = [item['id'] for item in response.data['results']]
+        self.assertEqual(first_page, [recipes[0].id, recipes[1].id])
+        self.assertEqual(second_page, [recipes[2].id, recipes[3].id])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([item['id'] for item in response.data['results']], [new_recipe.id])
+
     def test_recipe_detail_view(self):
         """testing accessing recipe detail view"""
         recipe = sample_recipe(self.user)
@@ -235,3 +261,94 @@ class RecipeImageUploadTests(APITestCase):
         self.assertIn(serializer1.data, response.data)
         self.assertIn(serializer2.data, response.data)
         self.assertNotIn(serializer3.data, response.data)
+
+    def test_filter_recipes_matching_all_tags(self):
+        """match=all only returns recipes having every requested tag"""
+        tag1 = sample_tag(self.user, name='Vegan')
+        tag2 = sample_tag(self.user, name='Spicy')
+        recipe1 = sample_recipe(self.user, title='Vegan chilli')
+        recipe1.tags.add(tag1, tag2)
+        recipe2 = sample_recipe(self.user, title='Vegan salad')
+        recipe2.tags.add(tag1)
+
+        response = self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [RecipeSerializer(recipe1).data])
+
+    def test_filter_recipes_without_duplicates(self):
+        """a recipe matching several tags and ingredients is returned once"""
+        tag1 = sample_tag(self.user, name='Vegan')
+        tag2 = sample_tag(self.user, name='Spicy')
+        ingredient1 = sample_ingredient(self.user, name='beans')
+        ingredient2 = sample_ingredient(self.user, name='chilli')
+        recipe = sample_recipe(self.user, title='Vegan chilli')
+        recipe.tags.add(tag1, tag2)
+        recipe.ingredients.add(ingredient1, ingredient2)
+
+        response = self.client.get(RECIPE_URL, {
+            'tags': f'{tag1.id},{tag2.id}',
+            'ingredients': f'{ingredient1.id},{ingredient2.id}',
+        })
+        self.assertEqual(response.data, [RecipeSerializer(recipe).data])
+
+    def test_filter_recipes_invalid_params(self):
+        """malformed filters are rejected instead of raising server errors"""
+        too_many = ','.join(str(i) for i in range(1000))
+        for params in ({'tags': '1,a'}, {'ingredients': '1,,2'}, {'tags': too_many}, {'match': 'some'}):
+            response = self.client.get(RECIPE_URL, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_match_is_only_validated_by_list(self):
+        """an invalid match fails listing recipes but not reading, updating or deleting one"""
+        recipe = sample_recipe(self.user)
+        url = f'{recipe_detail_url(recipe.id)}?match=some'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.patch(url, {'title': 'soup'}).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_filter_recipes_by_price_and_time(self):
+        """range filters combine with each other and with the tag filter"""
+        tag = sample_tag(self.user, name='Quick')
+        cheap_quick = sample_recipe(self.user, title='toast', price=2.50, time_minutes=5)
+        cheap_quick.tags.add(tag)
+        sample_recipe(self.user, title='stew', price=4.00, time_minutes=120)
+        sample_recipe(self.user, title='steak', price=25.00, time_minutes=20)
+
+        response = self.client.get(RECIPE_URL, {'max_price': '10', 'max_time': 30, 'tags': f'{tag.id}'})
+        self.assertEqual([recipe['id'] for recipe in response.data], [cheap_quick.id])
+        response = self.client.get(RECIPE_URL, {'min_price': '3', 'ordering': 'price'})
+        # self.recipe costs 5.00
+        self.assertEqual([recipe['title'] for recipe in response.data], ['stew', 'sample recipe', 'steak'])
+
+    def test_filter_recipes_by_unstorable_prices(self):
+        """price bounds above the largest price or finer than cents still filter"""
+        sample_recipe(self.user, title='stew', price=12.34)
+        sample_recipe(self.user, title='steak', price=12.35)
+
+        response = self.client.get(RECIPE_URL, {'max_price': '100', 'ordering': 'price'})
+        self.assertEqual([recipe['title'] for recipe in response.data], ['sample recipe', 'stew', 'steak'])
+        response = self.client.get(RECIPE_URL, {'max_price': '12.345', 'min_price': '12.3401'})
+        self.assertEqual([recipe['title'] for recipe in response.data], [])
+        response = self.client.get(RECIPE_URL, {'max_price': '12.345', 'min_price': '5.001'})
+        self.assertEqual([recipe['title'] for recipe in response.data], ['stew'])
+
+    def test_order_recipes_paginated(self):
+        """cursor pages follow the requested ordering"""
+        for minutes in (30, 10, 20, 10):
+            sample_recipe(self.user, time_minutes=minutes)
+
+        # self.recipe takes 10 minutes as well
+        response = self.client.get(RECIPE_URL, {'ordering': '-time_minutes', 'page_size': 3})
+        minutes = [recipe['time_minutes'] for recipe in response.data['results']]
+        response = self.client.get(response.data['next'])
+        minutes += [recipe['time_minutes'] for recipe in response.data['results']]
+        self.assertEqual(minutes, [30, 20, 10, 10, 10])
+
+    def test_range_filters_invalid_params(self):
+        params_list = (
+            {'min_price': 'cheap'}, {'max_price': '-1'}, {'max_price': 'Infinity'}, {'max_time': '1.5'},
+            {'min_price': '10', 'max_price': '5'}, {'ordering': 'title'},
+        )
+        for params in params_list:
+            response = self.client.get(RECIPE_URL, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
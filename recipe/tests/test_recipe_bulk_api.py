@@ -0,0 +1,100 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.models import Recipe, Tag, Ingredient
+
+User = get_user_model()
+RECIPE_URL = reverse('recipe:recipes-list')
+BULK_URL = reverse('recipe:recipes-bulk')
+
+
+def recipe_payload(**kwargs):
+    payload = {'title': 'bulk recipe', 'time_minutes': 10, 'price': '5.00'}
+    payload.update(kwargs)
+    return payload
+
+
+class RecipeBulkApiTests(APITestCase):
+    """testing bulk create, update and delete of recipes"""
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        self.user2 = User.objects.create_user(email='asdf@asdf.com', password='hiwa_asdf')
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(name='vegan', creator=self.user)
+        self.ingredient = Ingredient.objects.create(name='beans', creator=self.user)
+
+    def test_bulk_create(self):
+        payload = [
+            recipe_payload(title='first', tags=[self.tag.id], ingredients=[self.ingredient.id]),
+            recipe_payload(title='second'),
+        ]
+        response = self.client.post(BULK_URL, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        recipes = Recipe.objects.filter(id__in=response.data['ids']).order_by('id')
+        self.assertEqual([recipe.title for recipe in recipes], ['first', 'second'])
+        self.assertEqual(list(recipes[0].tags.all()), [self.tag])
+        self.assertEqual(list(recipes[0].ingredients.all()), [self.ingredient])
+        self.assertTrue(all(recipe.creator == self.user for recipe in recipes))
+
+    def test_bulk_create_reports_item_errors(self):
+        """nothing is written when any item is invalid"""
+        payload = [recipe_payload(), recipe_payload(tags=[self.tag.id, 9999]), {'title': 'no time'}]
+        response = self.client.post(BULK_URL, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('tags', response.data[1])
+        self.assertIn('time_minutes', response.data[2])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_rejects_non_list(self):
+        response = self.client.post(BULK_URL, recipe_payload(), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(connection.features.can_return_rows_from_bulk_insert, 'needs ids back from bulk inserts')
+    def test_bulk_create_query_count_is_constant(self):
+        payload = [recipe_payload(tags=[self.tag.id], ingredients=[self.ingredient.id]) for _ in range(500)]
+        # related ids, recipes, two through inserts, two creator lookups and the savepoint pair
+        with self.assertNumQueries(9):
+            response = self.client.post(BULK_URL, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.tags.through.objects.count(), 500)
+
+    def test_bulk_update(self):
+        recipe1 = Recipe.objects.create(creator=self.user, title='one', time_minutes=5, price=1)
+        recipe2 = Recipe.objects.create(creator=self.user, title='two', time_minutes=5, price=1)
+        recipe2.tags.add(self.tag)
+        payload = [{'id': recipe1.id, 'title': 'uno', 'tags': [self.tag.id]}, {'id': recipe2.id, 'tags': []}]
+        response = self.client.patch(BULK_URL, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe1.title, 'uno')
+        self.assertEqual(recipe2.title, 'two')
+        self.assertEqual(list(recipe1.tags.all()), [self.tag])
+        self.assertFalse(recipe2.tags.exists())
+
+    def test_bulk_update_other_users_recipe(self):
+        recipe = Recipe.objects.create(creator=self.user2, title='theirs', time_minutes=5, price=1)
+        response = self.client.patch(BULK_URL, [{'id': recipe.id, 'title': 'mine'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'theirs')
+
+    def test_bulk_delete(self):
+        mine = Recipe.objects.create(creator=self.user, title='mine', time_minutes=5, price=1)
+        theirs = Recipe.objects.create(creator=self.user2, title='theirs', time_minutes=5, price=1)
+        response = self.client.delete(BULK_URL, {'ids': [mine.id, theirs.id]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Recipe.objects.filter(id=mine.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=theirs.id).exists())
+
+    def test_bulk_writes_invalidate_list_cache(self):
+        self.client.get(RECIPE_URL)
+        self.client.post(BULK_URL, [recipe_payload()], format='json')
+        response = self.client.get(RECIPE_URL)
+        self.assertEqual(len(response.data), 1)
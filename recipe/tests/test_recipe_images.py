@@ -0,0 +1,142 @@
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.move import file_move_safe
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.models import Recipe
+from recipe.images import generated_variants, variant_name
+
+User = get_user_model()
+RECIPE_URL = reverse('recipe:recipes-list')
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipes-upload-image', args=[recipe_id])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_VARIANT_WORKERS=0)
+class RecipeImageVariantTests(APITestCase):
+    """resized variants are generated for uploads and exposed next to the original"""
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(creator=self.user, title='soup', time_minutes=5, price=2.00)
+
+    def upload(self, size=(2000, 1000)):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', size).save(ntf, format='JPEG')
+            ntf.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(image_upload_url(self.recipe.id), {'image': ntf}, format='multipart')
+        self.recipe.refresh_from_db()
+        return response
+
+    def test_upload_generates_variants(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['image_variants']), {'128', '512', '1024'})
+        for size in (128, 512, 1024):
+            with default_storage.open(variant_name(self.recipe.image.name, size)) as file:
+                image = Image.open(file)
+                self.assertEqual(image.format, 'WEBP')
+                self.assertEqual(image.size, (size, size // 2))
+
+    def test_small_images_are_not_upscaled(self):
+        self.upload(size=(100, 50))
+        with default_storage.open(variant_name(self.recipe.image.name, 1024)) as file:
+            self.assertEqual(Image.open(file).size, (100, 50))
+
+    def test_missing_variants_are_regenerated(self):
+        self.upload()
+        name = variant_name(self.recipe.image.name, 512)
+        default_storage.delete(name)
+        # deleted behind the app's back, found missing by a process that doesn't know the image yet
+        generated_variants.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(RECIPE_URL)
+        self.assertTrue(response.data[0]['image_variants']['512'].endswith(self.recipe.image.url))
+        self.assertTrue(default_storage.exists(name))
+        response = self.client.get(RECIPE_URL)
+        self.assertTrue(response.data[0]['image_variants']['512'].endswith(default_storage.url(name)))
+
+    def test_generated_variants_dont_stat_storage(self):
+        self.upload()
+        generated_variants.clear()
+        self.client.get(RECIPE_URL)
+        with patch.object(default_storage, 'exists', side_effect=AssertionError):
+            response = self.client.get(RECIPE_URL, {'page_size': 10})
+            detail = self.client.get(reverse('recipe:recipes-detail', args=[self.recipe.id]))
+        self.assertTrue(response.data['results'][0]['image_variants']['512'].endswith(
+            default_storage.url(variant_name(self.recipe.image.name, 512))
+        ))
+        self.assertEqual(detail.data['image_variants'], response.data['results'][0]['image_variants'])
+
+    @override_settings(RECIPE_IMAGE_UPLOAD_CHUNK_SIZE=1024)
+    def test_upload_is_streamed_to_disk_and_moved(self):
+        """uploads go through a temporary file which is moved into the recipe image location"""
+        with patch('core.storage.file_move_safe', wraps=file_move_safe) as move:
+            response = self.upload(size=(20, 20))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        move.assert_called_once()
+        self.assertTrue(default_storage.exists(self.recipe.image.name))
+
+    def test_upload_over_byte_limit(self):
+        with override_settings(RECIPE_IMAGE_MAX_BYTES=100, RECIPE_IMAGE_UPLOAD_CHUNK_SIZE=64):
+            response = self.upload(size=(500, 500))
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertFalse(self.recipe.image)
+
+    def test_upload_with_declared_length_over_limit(self):
+        """bodies announced as too large are rejected before being read"""
+        with override_settings(RECIPE_IMAGE_MAX_BYTES=100):
+            response = self.client.post(
+                image_upload_url(self.recipe.id), b'x' * 100000, content_type='multipart/form-data; boundary=x'
+            )
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_upload_over_pixel_limit(self):
+        with override_settings(RECIPE_IMAGE_MAX_PIXELS=100 * 100):
+            response = self.upload(size=(101, 100))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', response.data)
+
+    @override_settings(IMAGE_BLOB_GRACE_SECONDS=0)
+    def test_replaced_image_is_reclaimed(self):
+        self.upload(size=(30, 30))
+        old_name = self.recipe.image.name
+        self.upload(size=(40, 40))
+        self.assertNotEqual(old_name, self.recipe.image.name)
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertFalse(default_storage.exists(variant_name(old_name, 128)))
+
+    @override_settings(IMAGE_BLOB_GRACE_SECONDS=0)
+    def test_shared_image_is_kept_while_referenced(self):
+        """identical uploads share one file, which stays until its last recipe lets go"""
+        self.upload(size=(30, 30))
+        shared_name = self.recipe.image.name
+        other = Recipe.objects.create(creator=self.user, title='stew', time_minutes=5, price=2.00)
+        other.image = shared_name
+        other.save()
+        self.upload(size=(40, 40))
+        self.assertTrue(default_storage.exists(shared_name))
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertFalse(default_storage.exists(shared_name))
+
+    def test_recipes_without_image(self):
+        response = self.client.get(RECIPE_URL)
+        self.assertIsNone(response.data[0]['image_variants'])
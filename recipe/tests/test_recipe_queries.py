@@ -0,0 +1,129 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.models import Recipe, Tag, Ingredient
+
+User = get_user_model()
+RECIPE_URL = reverse('recipe:recipes-list')
+
+
+def recipe_detail_url(pk):
+    """return recipe detail url"""
+    return reverse('recipe:recipes-detail', args=[pk])
+
+
+def create_recipes(creator, count):
+    """bulk create recipes, each one with a tag and an ingredient"""
+    tag = Tag.objects.create(name='query tag', creator=creator)
+    ingredient = Ingredient.objects.create(name='query ingredient', creator=creator)
+    Recipe.objects.bulk_create(
+        Recipe(creator=creator, title=f'recipe {i}', time_minutes=10, price=5.00)
+        for i in range(count)
+    )
+    recipes = list(Recipe.objects.filter(creator=creator))
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id) for recipe in recipes
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        Recipe.ingredients.through(recipe_id=recipe.id, ingredient_id=ingredient.id) for recipe in recipes
+    )
+    return recipes
+
+
+class RecipeQueryCountTests(APITestCase):
+    """number of queries must not grow with the number of recipes"""
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        self.client.force_authenticate(self.user)
+
+    def assert_list_queries(self, count):
+        create_recipes(self.user, count)
+        # recipes + tags prefetch + ingredients prefetch
+        with self.assertNumQueries(3):
+            response = self.client.get(RECIPE_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), count)
+        self.assertEqual(len(response.data[0]['tags']), 1)
+        self.assertEqual(len(response.data[0]['ingredients']), 1)
+
+    def test_list_queries_one_recipe(self):
+        self.assert_list_queries(1)
+
+    def test_list_queries_hundred_recipes(self):
+        self.assert_list_queries(100)
+
+    def test_list_queries_thousand_recipes(self):
+        self.assert_list_queries(1000)
+
+    def test_retrieve_queries(self):
+        """detail view with nested tags and ingredients"""
+        recipe = create_recipes(self.user, 1)[0]
+        with self.assertNumQueries(3):
+            response = self.client.get(recipe_detail_url(recipe.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['tags'][0]['name'], 'query tag')
+        self.assertEqual(response.data['ingredients'][0]['name'], 'query ingredient')
+
+    def test_create_response_queries(self):
+        """serializing the created recipe costs one query per relation"""
+        tag = Tag.objects.create(name='vegan', creator=self.user)
+        data = {
+            'title': 'chocolate cheesecake',
+            'time_minutes': 30,
+            'price': 5.00,
+            'tags': [tag.id],
+        }
+        # includes the cache invalidation lookup of the tags' creators
+        with self.assertNumQueries(9):
+            response = self.client.post(RECIPE_URL, data=data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['tags'], [tag.id])
+
+
+class SparseFieldsetTests(APITestCase):
+    """?fields= and ?expand= prune responses and the queries behind them"""
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        self.client.force_authenticate(self.user)
+        self.recipes = create_recipes(self.user, 10)
+
+    def test_list_selected_fields_skip_relations_and_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(RECIPE_URL, {'fields': 'id,title,image'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"price"', queries[0]['sql'])
+        self.assertEqual(set(response.data[0]), {'id', 'title', 'image'})
+
+    def test_list_selected_fields_paginated_by_other_column(self):
+        """ordering columns are loaded too, so cursors don't cost a query per row"""
+        with self.assertNumQueries(1):
+            response = self.client.get(RECIPE_URL, {'fields': 'title', 'ordering': 'price', 'page_size': 5})
+        self.assertEqual(set(response.data['results'][0]), {'title'})
+        self.assertIsNotNone(response.data['next'])
+
+    def test_list_expand_nests_requested_relation(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(RECIPE_URL, {'fields': 'id,tags', 'expand': 'tags'})
+        self.assertEqual(response.data[0]['tags'][0]['name'], 'query tag')
+        self.assertNotIn('ingredients', response.data[0])
+
+    def test_list_expand_keeps_other_fields(self):
+        response = self.client.get(RECIPE_URL, {'expand': 'ingredients'})
+        self.assertEqual(response.data[0]['ingredients'][0]['name'], 'query ingredient')
+        self.assertIsInstance(response.data[0]['tags'][0], int)
+        self.assertIn('price', response.data[0])
+
+    def test_retrieve_selected_fields(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(recipe_detail_url(self.recipes[0].id), {'fields': 'id,title'})
+        self.assertEqual(response.data, {'id': self.recipes[0].id, 'title': self.recipes[0].title})
+
+    def test_invalid_fieldsets(self):
+        for params in ({'fields': 'id,secret'}, {'fields': ','}, {'expand': 'creator'}):
+            response = self.client.get(RECIPE_URL, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
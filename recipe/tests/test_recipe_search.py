@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import get_cache
+
+User = get_user_model()
+RECIPE_URL = reverse('recipe:recipes-list')
+
+
+class RecipeSearchApiTests(APITestCase):
+    """testing full-text search of recipes"""
+    def setUp(self) -> None:
+        get_cache().clear()
+        self.user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        self.user2 = User.objects.create_user(email='asdf@asdf.com', password='hiwa_asdf')
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag = Tag.objects.create(name='curry', creator=self.user)
+            self.ingredient = Ingredient.objects.create(name='chicken', creator=self.user)
+            self.titled = self.create_recipe('red curry')
+            self.tagged = self.create_recipe('weeknight dinner', tags=[self.tag])
+            self.both = self.create_recipe('chicken curry', tags=[self.tag], ingredients=[self.ingredient])
+            self.other = self.create_recipe('lentil soup')
+            self.create_recipe('curry', creator=self.user2)
+
+    def create_recipe(self, title, creator=None, tags=(), ingredients=()):
+        recipe = Recipe.objects.create(title=title, creator=creator or self.user, time_minutes=10, price=5)
+        recipe.tags.set(tags)
+        recipe.ingredients.set(ingredients)
+        return recipe
+
+    def search(self, query, **params):
+        response = self.client.get(RECIPE_URL, {'search': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def ids(self, response):
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        return [recipe['id'] for recipe in results]
+
+    def test_search_ranks_title_tag_and_ingredient_matches(self):
+        """title matches outrank tag matches, matching more fields ranks higher"""
+        response = self.search('curry')
+        self.assertEqual(self.ids(response), [self.both.id, self.titled.id, self.tagged.id])
+
+    def test_search_requires_every_term(self):
+        self.assertEqual(self.ids(self.search('curry chicken')), [self.both.id])
+        self.assertEqual(self.ids(self.search('lentil curry')), [])
+
+    def test_search_matches_ingredient_names(self):
+        self.assertEqual(self.ids(self.search('chicken')), [self.both.id])
+
+    def test_search_follows_tag_renames(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = 'thai'
+            self.tag.save()
+        self.assertEqual(self.ids(self.search('thai')), [self.tagged.id, self.both.id])
+
+    def test_search_follows_recipe_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('recipe:recipes-detail', args=[self.other.id]), {'title': 'curry soup'})
+        self.assertIn(self.other.id, self.ids(self.search('curry')))
+
+    def test_search_is_paginated_by_rank(self):
+        first = self.search('curry', page_size=2)
+        second = self.client.get(first.data['next'])
+        self.assertEqual(self.ids(first) + self.ids(second), [self.both.id, self.titled.id, self.tagged.id])
+
+    def test_search_too_long(self):
+        response = self.client.get(RECIPE_URL, {'search': 'a' * 257})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,131 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.models import Recipe, Tag, Ingredient
+
+User = get_user_model()
+EXPORT_URL = reverse('recipe:recipes-export')
+IMPORT_URL = reverse('recipe:recipes-import')
+
+
+class RecipeTransferTests(APITestCase):
+    """testing streaming export and import of recipe libraries"""
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        self.user2 = User.objects.create_user(email='asdf@asdf.com', password='hiwa_asdf')
+        self.client.force_authenticate(self.user)
+        vegan = Tag.objects.create(name='vegan', creator=self.user)
+        quick = Tag.objects.create(name='quick', creator=self.user)
+        beans = Ingredient.objects.create(name='beans', creator=self.user)
+        recipe = Recipe.objects.create(creator=self.user, title='chilli', time_minutes=30, price='4.50')
+        recipe.tags.add(vegan, quick)
+        recipe.ingredients.add(beans)
+        Recipe.objects.create(creator=self.user, title='toast, "buttered"', time_minutes=5, price=1, link='x')
+        Recipe.objects.create(creator=self.user2, title='not mine', time_minutes=5, price=1)
+
+    def export(self, file_format):
+        response = self.client.get(EXPORT_URL, {'format': file_format})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="recipes.{file_format}"')
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        rows = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual(rows, [
+            {'title': 'chilli', 'time_minutes': 30, 'price': '4.50', 'link': '',
+             'tags': ['vegan', 'quick'], 'ingredients': ['beans']},
+            {'title': 'toast, "buttered"', 'time_minutes': 5, 'price': '1.00', 'link': 'x',
+             'tags': [], 'ingredients': []},
+        ])
+
+    @override_settings(RECIPE_TRANSFER_CHUNK_SIZE=1)
+    def test_export_csv(self):
+        rows = list(csv.reader(io.StringIO(self.export('csv'))))
+        self.assertEqual(rows, [
+            ['title', 'time_minutes', 'price', 'link', 'tags', 'ingredients'],
+            ['chilli', '30', '4.50', '', '["vegan","quick"]', '["beans"]'],
+            ['toast, "buttered"', '5', '1.00', 'x', '[]', '[]'],
+        ])
+
+    def test_export_csv_without_recipes(self):
+        self.client.force_authenticate(User.objects.create_user(email='new@gmail.com', password='hiwa_asdf'))
+        self.assertEqual(self.export('csv'), 'title,time_minutes,price,link,tags,ingredients\r\n')
+
+    def test_export_unknown_format(self):
+        response = self.client.get(EXPORT_URL, {'format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def assertRoundTrip(self, file_format, content_type):
+        exported = self.export(file_format)
+        self.client.force_authenticate(self.user2)
+        with override_settings(RECIPE_TRANSFER_CHUNK_SIZE=1):
+            response = self.client.post(IMPORT_URL, exported, content_type=content_type)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data, {'created': 2, 'failed': 0, 'errors': []})
+        imported = Recipe.objects.filter(creator=self.user2, title='chilli').get()
+        self.assertEqual(sorted(imported.tags.values_list('name', flat=True)), ['quick', 'vegan'])
+        self.assertEqual(list(imported.ingredients.values_list('name', flat=True)), ['beans'])
+        self.assertTrue(Recipe.objects.filter(creator=self.user2, title='toast, "buttered"', link='x').exists())
+
+    def test_round_trip_ndjson(self):
+        self.assertRoundTrip('ndjson', 'application/x-ndjson')
+
+    def test_round_trip_csv(self):
+        self.assertRoundTrip('csv', 'text/csv')
+
+    def test_import_reports_invalid_rows(self):
+        body = '\n'.join([
+            json.dumps({'title': 'soup', 'time_minutes': 20, 'price': '3', 'tags': ['Winter', 'winter']}),
+            '{not json',
+            json.dumps({'title': 'no time', 'price': '3'}),
+            '',
+            json.dumps(['a list']),
+        ])
+        response = self.client.post(IMPORT_URL, body, content_type='application/x-ndjson')
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['failed'], 3)
+        self.assertEqual([error['line'] for error in response.data['errors']], [2, 3, 5])
+        self.assertIn('time_minutes', response.data['errors'][1]['errors'])
+        soup = Recipe.objects.get(title='soup')
+        self.assertEqual(list(soup.tags.values_list('name', flat=True)), ['winter'])
+
+    @override_settings(RECIPE_TRANSFER_CHUNK_SIZE=1)
+    def test_import_reports_lines_that_arent_utf8(self):
+        """an undecodable line is a row error, after and before it rows are still imported"""
+        rows = [json.dumps({'title': title, 'time_minutes': 5, 'price': '1'}).encode() for title in ('a', 'b')]
+        body = b'\n'.join([rows[0], b'{"title": "\xff"}', rows[1]])
+        response = self.client.post(IMPORT_URL, body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {
+            'created': 2, 'failed': 1, 'errors': [{'line': 2, 'errors': 'Not valid utf-8.'}],
+        })
+
+    def test_import_reports_csv_rows_that_arent_utf8(self):
+        body = b'title,time_minutes,price\r\na,5,1\r\n"\xff\r\nb",5,1\r\nc,5,1\r\n'
+        response = self.client.post(IMPORT_URL, body, content_type='text/csv')
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['errors'], [{'line': 4, 'errors': 'Not valid utf-8.'}])
+
+    def test_import_unsupported_media_type(self):
+        response = self.client.post(IMPORT_URL, {'title': 'x'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_commands_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recipes.csv')
+            call_command('export_recipes', 'hiwa@gmail.com', format='csv', output=path)
+            out = io.StringIO()
+            call_command('import_recipes', 'asdf@asdf.com', path, stdout=out)
+        self.assertIn('2 recipes created, 0 failed', out.getvalue())
+        self.assertEqual(Recipe.objects.filter(creator=self.user2).count(), 3)
@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.models import Tag, Ingredient
+from recipe.cache import get_cache
+from recipe.suggest import local_indexes
+
+User = get_user_model()
+TAG_SUGGEST_URL = reverse('recipe:tags-suggest')
+INGREDIENT_SUGGEST_URL = reverse('recipe:ingredients-suggest')
+
+
+class SuggestApiTests(APITestCase):
+    """testing as-you-type suggestions of tags and ingredients"""
+    def setUp(self) -> None:
+        get_cache().clear()
+        local_indexes.clear()
+        self.user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        self.user2 = User.objects.create_user(email='asdf@asdf.com', password='hiwa_asdf')
+        self.client.force_authenticate(self.user)
+        for name in ('pepper', 'peas', 'pear', 'salt', 'penne'):
+            Ingredient.objects.create(name=name, creator=self.user)
+        Ingredient.objects.create(name='pecan', creator=self.user2)
+        Tag.objects.create(name='vegan', creator=self.user)
+        Tag.objects.create(name='vegetarian', creator=self.user)
+
+    def names(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in response.data]
+
+    def test_suggest_prefix_matches_in_order(self):
+        self.assertEqual(self.names(INGREDIENT_SUGGEST_URL, q='pe'), ['pear', 'peas', 'penne', 'pepper'])
+        self.assertEqual(self.names(TAG_SUGGEST_URL, q='veg'), ['vegan', 'vegetarian'])
+
+    def test_suggest_is_case_insensitive_and_limited(self):
+        self.assertEqual(self.names(INGREDIENT_SUGGEST_URL, q='PE', limit=2), ['pear', 'peas'])
+
+    def test_suggest_returns_ids(self):
+        response = self.client.get(INGREDIENT_SUGGEST_URL, {'q': 'salt'})
+        salt = Ingredient.objects.get(name='salt')
+        self.assertEqual(response.data, [{'id': salt.id, 'name': 'salt'}])
+
+    def test_suggest_sees_new_names(self):
+        self.names(INGREDIENT_SUGGEST_URL, q='pe')
+        Ingredient.objects.create(name='pesto', creator=self.user)
+        self.assertIn('pesto', self.names(INGREDIENT_SUGGEST_URL, q='pes'))
+
+    def test_suggest_served_from_memory(self):
+        self.names(INGREDIENT_SUGGEST_URL, q='pe')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(INGREDIENT_SUGGEST_URL, q='sa'), ['salt'])
+
+    @override_settings(SUGGEST_CACHE_MAX_NAMES=2)
+    def test_suggest_from_database_for_many_names(self):
+        self.assertEqual(self.names(INGREDIENT_SUGGEST_URL, q='pe', limit=3), ['pear', 'peas', 'penne'])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.names(INGREDIENT_SUGGEST_URL, q='sa'), ['salt'])
+
+    @override_settings(SUGGEST_CACHE_MAX_TOTAL_NAMES=6)
+    def test_suggest_evicts_by_names_held(self):
+        """the user's five names and the two tags don't fit together, so the ingredients are read again"""
+        self.names(INGREDIENT_SUGGEST_URL, q='pe')
+        self.names(TAG_SUGGEST_URL, q='veg')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.names(INGREDIENT_SUGGEST_URL, q='sa'), ['salt'])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.names(TAG_SUGGEST_URL, q='vega'), ['vegan'])
+
+    def test_suggest_prefix_past_every_name(self):
+        Ingredient.objects.create(name='café', creator=self.user)
+        self.assertEqual(self.names(INGREDIENT_SUGGEST_URL, q='caf'), ['café'])
+        self.assertEqual(self.names(INGREDIENT_SUGGEST_URL, q='z'), [])
+
+    def test_suggest_invalid_limit(self):
+        for limit in ('0', '51', 'ten'):
+            response = self.client.get(INGREDIENT_SUGGEST_URL, {'q': 'pe', 'limit': limit})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -76,3 +76,27 @@ class TestTagApiAuthenticatedUser(APITestCase):
         serializer2 = TagSerializer(tag2)
         self.assertIn(serializer.data, response.data)
         self.assertNotIn(serializer2.data, response.data)
+
+    def test_tags_cursor_pagination(self):
+        """tags are paged by descending name"""
+        for name in ('apple', 'carrot', 'banana'):
+            Tag.objects.create(creator=self.user, name=name)
+        response = self.client.get(tag_url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        names = [item['name'] for item in response.data['results']]
+        self.assertEqual(names, ['pizza', 'carrot'])
+        response = self.client.get(response.data['next'])
+        names = [item['name'] for item in response.data['results']]
+        self.assertEqual(names, ['banana', 'apple'])
+        self.assertIsNone(response.data['next'])
+
+    def test_assigned_tags_are_unique(self):
+        """a tag used by several recipes is listed once"""
+        tag = Tag.objects.create(creator=self.user, name='breakfast')
+        for title in ('eggs', 'toast'):
+            recipe = Recipe.objects.create(creator=self.user, title=title, time_minutes=5, price=3.00)
+            recipe.tags.add(tag)
+
+        response = self.client.get(tag_url, data={'assigned_only': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [TagSerializer(tag).data])
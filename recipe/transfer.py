@@ -0,0 +1,151 @@
+import csv
+import json
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from core.models import Tag, Ingredient, Recipe
+from core.renderers import CSVRenderer, NDJSONRenderer, orjson
+from .bulk import resolve_names, bulk_create_recipes
+from .readers import ValuesReader, represent_chunks
+from .serializers import RecipeExportSerializer, RecipeImportSerializer
+
+FIELDS = RecipeExportSerializer.Meta.fields
+RELATIONS = ('tags', Tag), ('ingredients', Ingredient)
+loads = orjson.loads if orjson is not None else json.loads
+
+
+def export_chunks(user, chunk_size=None):
+    """the user's recipes in id order, represented in chunks read through a server side cursor"""
+    reader = ValuesReader(RecipeExportSerializer())
+    queryset = reader.values(Recipe.objects.filter(creator=user).order_by('id'))
+    return represent_chunks(reader, queryset, chunk_size or settings.RECIPE_TRANSFER_CHUNK_SIZE)
+
+
+def export_ndjson(user, chunk_size=None):
+    """one JSON recipe per line"""
+    renderer = NDJSONRenderer()
+    for chunk in export_chunks(user, chunk_size):
+        yield renderer.render(chunk)
+
+
+def export_csv(user, chunk_size=None):
+    """a header row and one row per recipe, tag and ingredient names as JSON arrays"""
+    renderer = CSVRenderer()
+    yield renderer.render([], renderer_context={'header': FIELDS})
+    for chunk in export_chunks(user, chunk_size):
+        yield renderer.render(chunk, renderer_context={'header': None})
+
+
+def decode_lines(lines, invalid):
+    """
+    lines as text. the numbers of lines that aren't valid utf-8 are added to invalid, and the lines
+    decoded with replacement characters, so a parser can report them and go on with the next ones
+    """
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            try:
+                line = line.decode('utf-8')
+            except UnicodeDecodeError:
+                invalid.add(number)
+                line = line.decode('utf-8', 'replace')
+        yield line
+
+
+def parse_ndjson(lines):
+    """(line number, data, error) of every non-empty line"""
+    invalid = set()
+    for number, line in enumerate(decode_lines(lines, invalid), 1):
+        if number in invalid:
+            invalid.discard(number)
+            yield number, None, 'Not valid utf-8.'
+            continue
+        if not line.strip():
+            continue
+        try:
+            data = loads(line)
+        except ValueError:
+            yield number, None, 'Invalid JSON.'
+            continue
+        if not isinstance(data, dict):
+            yield number, None, 'Expected a JSON object.'
+            continue
+        yield number, data, None
+
+
+def parse_csv(lines):
+    """(line number, data, error) of every row after the header"""
+    invalid = set()
+    reader = csv.DictReader(decode_lines(lines, invalid))
+    rows = iter(reader)
+    while True:
+        try:
+            row = next(rows)
+        except StopIteration:
+            return
+        except csv.Error as error:
+            # e.g. a NUL byte or an oversized field, the reader goes on with the next line
+            yield reader.line_num, None, f'Invalid CSV: {error}.'
+            continue
+        # lines of this row (a quoted field can span several) that weren't utf-8
+        if invalid and min(invalid) <= reader.line_num:
+            invalid.difference_update(range(min(invalid), reader.line_num + 1))
+            yield reader.line_num, None, 'Not valid utf-8.'
+            continue
+        data = {field: value for field, value in row.items() if field in FIELDS and value is not None}
+        try:
+            for relation, _ in RELATIONS:
+                data[relation] = loads(data[relation]) if data.get(relation) else []
+        except ValueError:
+            yield reader.line_num, None, f'{relation} must be a JSON array of names.'
+            continue
+        yield reader.line_num, data, None
+
+
+PARSERS = {
+    'application/x-ndjson': parse_ndjson,
+    'text/csv': parse_csv,
+}
+
+
+def _write_batch(user, items):
+    """create a batch of validated items, tag and ingredient names resolved to ids first"""
+    with transaction.atomic():
+        for relation, model in RELATIONS:
+            names = {name for item in items for name in item[relation]}
+            objects = resolve_names(model, names, user) if names else {}
+            for item in items:
+                item[relation] = [objects[name].pk for name in item[relation]]
+        bulk_create_recipes(user, items)
+
+
+def import_recipes(user, rows, batch_size=None):
+    """
+    validate parsed rows one by one and create the valid ones in batched transactions,
+    so memory stays flat however large the file is. batches are committed as they go,
+    invalid rows are skipped and the first RECIPE_IMPORT_MAX_ERRORS of them reported
+    """
+    batch_size = batch_size or settings.RECIPE_TRANSFER_CHUNK_SIZE
+    result = {'created': 0, 'failed': 0, 'errors': []}
+    batch = []
+    # building serializer fields costs more than validating a row, so one instance validates every row
+    serializer = RecipeImportSerializer()
+    for line, data, error in rows:
+        if error is None:
+            try:
+                batch.append(serializer.run_validation(data))
+            except ValidationError as exc:
+                error = exc.detail
+        if error is not None:
+            result['failed'] += 1
+            if len(result['errors']) < settings.RECIPE_IMPORT_MAX_ERRORS:
+                result['errors'].append({'line': line, 'errors': error})
+        if len(batch) >= batch_size:
+            _write_batch(user, batch)
+            result['created'] += len(batch)
+            batch = []
+    if batch:
+        _write_batch(user, batch)
+        result['created'] += len(batch)
+    return result
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler, StopUpload
+
+# room for the multipart boundaries and headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    streams every upload to a temporary file in fixed size chunks, so nothing is buffered
+    in memory, and stops reading as soon as the size limit is passed. files on disk are later
+    moved into place by the storage instead of being copied
+    """
+
+    def __init__(self, request=None, max_bytes=None):
+        super().__init__(request)
+        self.chunk_size = settings.RECIPE_IMAGE_UPLOAD_CHUNK_SIZE
+        self.max_bytes = max_bytes or settings.RECIPE_IMAGE_MAX_BYTES
+        self.received = 0
+        self.exceeded = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.exceeded = True
+            raise StopUpload(connection_reset=True)
+        return super().receive_data_chunk(raw_data, start)
+
+
+def too_large(request):
+    """reject uploads whose declared length is already over the limit, before reading the body"""
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        content_length = 0
+    return content_length > settings.RECIPE_IMAGE_MAX_BYTES + MULTIPART_OVERHEAD
@@ -1,28 +1,83 @@
-from rest_framework import permissions, authentication, viewsets, mixins, status
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import permissions, viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError, UnsupportedMediaType
 from rest_framework.response import Response
 from django.views import View
 from .serializers import (TagSerializer, IngredientSerializer, RecipeSerializer, RecipeDetailSerializer,
-                          RecipeImageSerializer)
+                          RecipeImageSerializer, RecipeBulkSerializer, ResolveNamesSerializer,
+                          RecipeFilterSerializer)
+from .bulk import related_ids_context, resolve_names, bulk_create_recipes, bulk_update_recipes
+from .images import schedule_variants, release_image
+from .uploads import LimitedTemporaryFileUploadHandler, too_large
+from .cache import CachedListMixin, conditional_get
+from .readers import FastListMixin
+from .transfer import PARSERS, export_csv, export_ndjson, import_recipes
+from .signals import invalidate
+from .search import search_recipes
+from .suggest import suggest_names
+from .pagination import RecipeCursorPagination, RecipeAttrCursorPagination
 from core.models import Tag, Ingredient, Recipe
+from core.renderers import NDJSONRenderer, CSVRenderer
+from user.authentication import CachedTokenAuthentication
 
 
-class BaseRecipeAttrViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
+class BaseRecipeAttrViewSet(CachedListMixin, FastListMixin, mixins.ListModelMixin, mixins.CreateModelMixin,
+                            viewsets.GenericViewSet):
     """Base view for recipe attributes"""
-    authentication_classes = authentication.TokenAuthentication,
+    authentication_classes = CachedTokenAuthentication,
     permission_classes = permissions.IsAuthenticated,
+    pagination_class = RecipeAttrCursorPagination
+
+    default_suggestions = 10
+    max_suggestions = 50
 
     def get_queryset(self):
         """only objects created by user should be returned"""
         assigned_only = int(self.request.query_params.get('assigned_only', 0))
         queryset = super().get_queryset()
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False).distinct()
+            queryset = queryset.assigned()
         return queryset.filter(creator=self.request.user).order_by('-name')
 
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(creator=self.request.user)
 
+    def get_serializer_class(self):
+        if self.action == 'resolve':
+            return ResolveNamesSerializer
+        return self.serializer_class
+
+    @action(['POST'], detail=False)
+    def resolve(self, request):
+        """return ids for a list of names, creating the missing ones, in two queries"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        names = serializer.validated_data['names']
+        objects = resolve_names(self.queryset.model, names, request.user)
+        # bulk inserts don't send post_save
+        invalidate(request.user.pk)
+        return Response(self.serializer_class([objects[name] for name in names], many=True).data)
+
+    @action(['GET'], detail=False)
+    def suggest(self, request):
+        """the user's names starting with q in alphabetical order, for as-you-type completion"""
+        prefix = request.query_params.get('q', '')
+        if len(prefix) > 256:
+            raise ValidationError({'q': 'at most 256 characters are allowed'})
+        try:
+            limit = int(request.query_params.get('limit', self.default_suggestions))
+        except ValueError:
+            raise ValidationError({'limit': 'must be an integer'})
+        if not 1 <= limit <= self.max_suggestions:
+            raise ValidationError({'limit': f'must be between 1 and {self.max_suggestions}'})
+        return Response(suggest_names(self.queryset.model.objects.all(), request.user.pk, prefix, limit))
+
 
 class TagsViewSet(BaseRecipeAttrViewSet):
     serializer_class = TagSerializer
@@ -34,27 +89,122 @@ class IngredientsViewSet(BaseRecipeAttrViewSet):
     queryset = Ingredient.objects.all()
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedListMixin, FastListMixin, viewsets.ModelViewSet):
     serializer_class = RecipeSerializer
     permission_classes = permissions.IsAuthenticated,
-    authentication_classes = authentication.TokenAuthentication,
+    authentication_classes = CachedTokenAuthentication,
     queryset = Recipe.objects.all()
+    pagination_class = RecipeCursorPagination
 
-    def _comma_delimited_to_list(self, string):
+    max_filter_ids = 100
+    max_search_length = 256
+    max_bulk_size = 10000
+
+    def _comma_delimited_to_list(self, string, param='ids'):
         """converts comma delimited string to list of integers"""
-        return [int(str_id) for str_id in string.split(',')]
+        str_ids = string.split(',')
+        if len(str_ids) > self.max_filter_ids:
+            raise ValidationError({param: f'at most {self.max_filter_ids} ids are allowed'})
+        try:
+            return [int(str_id) for str_id in str_ids]
+        except ValueError:
+            raise ValidationError({param: 'must be a comma delimited list of integers'})
+
+    def _match_all(self):
+        """
+        whether tags/ingredients filters require every id (match=all) or any of them. an invalid value is
+        only rejected by list, so a stray match doesn't fail retrieve, update or delete
+        """
+        match = self.request.query_params.get('match', 'any')
+        if match not in ('any', 'all') and self.action == 'list':
+            raise ValidationError({'match': 'must be either any or all'})
+        return match == 'all'
 
     def get_queryset(self):
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
         queryset = super().get_queryset()
-        if tags:
-            tag_ids = self._comma_delimited_to_list(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._comma_delimited_to_list(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-        return queryset.filter(creator=self.request.user)
+        match_all = self._match_all()
+        for relation in ('tags', 'ingredients'):
+            value = self.request.query_params.get(relation)
+            if value:
+                ids = self._comma_delimited_to_list(value, relation)
+                queryset = queryset.filter_related(relation, ids, match_all)
+        queryset = queryset.filter(creator=self.request.user)
+        if self.action == 'list':
+            queryset = self._filter_list(queryset)
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+
+        # only read what the requested fields need, relations left out aren't prefetched at all
+        fields, expand = self._sparse_fieldset()
+        relations = [relation for relation in ('tags', 'ingredients') if fields is None or relation in fields]
+        nested = [relation for relation in relations if self.action == 'retrieve' or relation in expand]
+        ids_only = [relation for relation in relations if relation not in nested]
+        if ids_only:
+            queryset = queryset.with_related_ids(*ids_only)
+        if nested:
+            queryset = queryset.with_related_details(*nested)
+        if fields is not None:
+            queryset = queryset.only(*self._columns(queryset, fields))
+        return queryset
+
+    def _sparse_fieldset(self):
+        """validated ?fields= and ?expand= params, fields is None when every field is wanted"""
+        if not hasattr(self, '_fieldset'):
+            available = set(self.get_serializer_class()().fields)
+            fields = self.request.query_params.get('fields')
+            if fields is not None:
+                fields = {name for name in fields.split(',') if name}
+                if not fields or fields - available:
+                    choices = ', '.join(sorted(available))
+                    raise ValidationError({'fields': f'must be a comma delimited list of {choices}'})
+            expand = {name for name in self.request.query_params.get('expand', '').split(',') if name}
+            if expand - set(RecipeSerializer.expandable):
+                raise ValidationError({'expand': f'only {", ".join(RecipeSerializer.expandable)} can be expanded'})
+            self._fieldset = fields, expand
+        return self._fieldset
+
+    def _columns(self, queryset, fields):
+        """the columns serializing the given fields and paginating the queryset read"""
+        concrete = {field.name for field in Recipe._meta.concrete_fields}
+        ordering = {name.lstrip('-') for name in queryset.query.order_by or self.pagination_class.ordering}
+        columns = {'id'} | (fields & concrete) | (ordering & concrete)
+        if 'image_variants' in fields:
+            columns |= {'image', 'creator'}
+        return columns
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ('list', 'retrieve'):
+            kwargs['fields'], kwargs['expand'] = self._sparse_fieldset()
+        return super().get_serializer(*args, **kwargs)
+
+    def _filter_list(self, queryset):
+        """apply the search, range filters and ordering of the list query params"""
+        filters = RecipeFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        filters = filters.validated_data
+        if filters.get('min_price') is not None:
+            queryset = queryset.filter(price__gte=filters['min_price'])
+        if filters.get('max_price') is not None:
+            queryset = queryset.filter(price__lte=filters['max_price'])
+        if filters.get('max_time') is not None:
+            queryset = queryset.filter(time_minutes__lte=filters['max_time'])
+
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            if len(search) > self.max_search_length:
+                raise ValidationError({'search': f'at most {self.max_search_length} characters are allowed'})
+            queryset = search_recipes(queryset, search, self.request.user.pk).order_by('-search_rank', 'id')
+        if filters.get('ordering'):
+            queryset = queryset.order_by(*RecipeFilterSerializer.ORDERINGS[filters['ordering']])
+        return queryset
+
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(creator=self.request.user)
@@ -65,17 +215,103 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeDetailSerializer
         elif self.action == 'upload_image':
             return RecipeImageSerializer
+        elif self.action == 'bulk':
+            return RecipeBulkSerializer
         return self.serializer_class
 
+    def _image_too_large(self):
+        return Response(
+            {'image': [f'Images may be at most {settings.RECIPE_IMAGE_MAX_BYTES} bytes.']},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
     @action(['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """upload an image to a recipe"""
+        if too_large(request):
+            return self._image_too_large()
+        # must be installed before request.data parses the body
+        upload_handler = LimitedTemporaryFileUploadHandler(request._request)
+        request._request.upload_handlers = [upload_handler]
         recipe = self.get_object()
+        old_image = recipe.image.name
         serializer = self.get_serializer(
             recipe,
             data=request.data
         )
+        if upload_handler.exceeded:
+            return self._image_too_large()
         if serializer.is_valid():
-            serializer.save()
+            recipe = serializer.save()
+            schedule_variants(recipe.image.name, recipe.creator_id)
+            if old_image != recipe.image.name:
+                release_image(old_image)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def _bulk_items(self, data):
+        """validate the shape of a bulk payload before validating its items"""
+        if not isinstance(data, list) or not data:
+            raise ValidationError({'non_field_errors': ['Expected a non-empty list of recipes.']})
+        if len(data) > self.max_bulk_size:
+            raise ValidationError({'non_field_errors': [f'At most {self.max_bulk_size} recipes are allowed.']})
+        return data
+
+    @action(['POST', 'PATCH', 'DELETE'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """create, partially update or delete many recipes in one transaction"""
+        if request.method == 'DELETE':
+            ids = request.data.get('ids') if isinstance(request.data, dict) else None
+            if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+                raise ValidationError({'ids': ['Expected a list of recipe ids.']})
+            if len(ids) > self.max_bulk_size:
+                raise ValidationError({'ids': [f'At most {self.max_bulk_size} recipes are allowed.']})
+            Recipe.objects.filter(creator=request.user, id__in=ids).delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        items = self._bulk_items(request.data)
+        context = {**self.get_serializer_context(), **related_ids_context(items)}
+        serializer = self.get_serializer(
+            data=items, many=True, partial=request.method == 'PATCH', context=context
+        )
+        serializer.is_valid(raise_exception=True)
+        if request.method == 'POST':
+            recipes = bulk_create_recipes(request.user, serializer.validated_data)
+            return Response({'ids': [recipe.id for recipe in recipes]}, status=status.HTTP_201_CREATED)
+
+        ids = [item.get('id') for item in serializer.validated_data]
+        recipes = Recipe.objects.filter(creator=request.user).in_bulk([pk for pk in ids if pk is not None])
+        errors, seen = [], set()
+        for pk in ids:
+            if pk is None:
+                errors.append({'id': ['This field is required.']})
+            elif pk not in recipes:
+                errors.append({'id': ['Not found.']})
+            elif pk in seen:
+                errors.append({'id': ['Duplicate id.']})
+            else:
+                errors.append({})
+            seen.add(pk)
+        if any(errors):
+            raise ValidationError(errors)
+        bulk_update_recipes([recipes[pk] for pk in ids], serializer.validated_data)
+        return Response({'ids': ids})
+
+    @action(['GET'], detail=False, renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """stream the user's whole library as ?format=ndjson or csv, tags and ingredients by name"""
+        renderer = request.accepted_renderer
+        rows = export_csv(request.user) if renderer.format == 'csv' else export_ndjson(request.user)
+        response = StreamingHttpResponse(rows, content_type=f'{renderer.media_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="recipes.{renderer.format}"'
+        return response
+
+    @action(['POST'], detail=False, url_path='import', url_name='import')
+    def import_library(self, request):
+        """create recipes from an ndjson or csv export, read line by line from the request body"""
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type not in PARSERS:
+            raise UnsupportedMediaType(content_type)
+        # the body is iterated as it arrives instead of being parsed into request.data
+        result = import_recipes(request.user, PARSERS[content_type](request._request))
+        return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
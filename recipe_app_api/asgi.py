@@ -8,9 +8,65 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
 
 import os
+from contextlib import aclosing, nullcontext
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.http import JsonResponse
+
+from core.async_views import StreamThreadsBusy, database_iterate, stream_threads
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'recipe_app_api.settings')
 
-application = get_asgi_application()
+
+class AsyncViewsASGIHandler(ASGIHandler):
+    """resolves requests with the async views of recipe_app_api.asgi_urls"""
+    urlconf = 'recipe_app_api.asgi_urls'
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = self.urlconf
+        return request, error_response
+
+    async def send_response(self, response, send):
+        """
+        as django's, but streamed bodies are read a chunk at a time on a stream thread instead of
+        in the event loop, where the ORM can't run. they are sent in constant memory, and with a 503
+        instead when no stream thread frees up in time
+        """
+        if not response.streaming:
+            return await super().send_response(response, send)
+        try:
+            async with stream_threads.reserve() if settings.ASYNC_DB_WORKERS else nullcontext() as executor:
+                await self.send_streaming_response(response, send, executor)
+        except StreamThreadsBusy:
+            await sync_to_async(response.close, thread_sensitive=True)()
+            busy = JsonResponse({'detail': 'Too many responses are being streamed, try again later.'}, status=503)
+            busy['Retry-After'] = str(settings.ASYNC_DB_STREAM_QUEUE_TIMEOUT)
+            await super().send_response(busy, send)
+
+    async def send_streaming_response(self, response, send, executor):
+        response_headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            response_headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            response_headers.append((b'Set-Cookie', cookie.output(header='').encode('ascii').strip()))
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': response_headers})
+        async with aclosing(database_iterate(response, executor)) as parts:
+            async for part in parts:
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+
+# what get_asgi_application() does, with the handler above
+django.setup(set_prefix=False)
+application = AsyncViewsASGIHandler()
@@ -0,0 +1,13 @@
+"""
+URL configuration of ASGI workers: the same urls as recipe_app_api.urls, with the recipe,
+tag, ingredient and user views (signup and login included) served through core.async_views.async_view
+"""
+from core.async_views import async_patterns
+from recipe.views import BaseRecipeAttrViewSet, RecipeViewSet
+from user.views import CreateTokenView, CreateUserView, ManageUserView
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = async_patterns(
+    sync_urlpatterns, (BaseRecipeAttrViewSet, RecipeViewSet, CreateUserView, CreateTokenView, ManageUserView)
+)
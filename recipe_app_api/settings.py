@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -53,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.db.routers.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'recipe_app_api.urls'
@@ -82,25 +84,118 @@ WSGI_APPLICATION = 'recipe_app_api.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'recipe_db',
-        'USER': 'postgres',
-        'PASSWORD': '0426513',
-        'HOST': '127.0.0.1',
-        'PORT': '5432',
+        # django's postgres backend with connection health checks, see core.db.backends.postgresql
+        'ENGINE': 'core.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'recipe_db'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', '0426513'),
+        'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        # seconds connections are kept open across requests, 0 opens a new one for every request
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # check a kept connection before the first query of a request, replacing it if it was dropped
+        'CONN_HEALTH_CHECKS': bool(int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))),
+        # set DB_PGBOUNCER=1 behind pgbouncer in transaction pooling mode, where cursors can't outlive
+        # a transaction. chunked reads then go by keyset instead, see recipe.readers.represent_chunks
+        'DISABLE_SERVER_SIDE_CURSORS': bool(int(os.environ.get('DB_PGBOUNCER', 0))),
     }
 }
 
+# read replicas of default, e.g. DB_REPLICA_HOSTS=replica-1,replica-2. reads of GET/HEAD/OPTIONS
+# requests go to one of them, everything else to default, see core.db.routers
+DATABASE_REPLICAS = []
+replica_hosts = [host.strip() for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+for index, host in enumerate(replica_hosts):
+    DATABASES[f'replica_{index}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica_{index}')
+DATABASE_ROUTERS = ['core.db.routers.PrimaryReplicaRouter']
+# a user's reads stay on default for this many seconds after they write, keep it above the replicas' lag.
+# the pins are kept in this cache, which has to be shared between workers (checked, see core.checks)
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 10))
+REPLICA_PIN_CACHE_ALIAS = 'default'
+
+
+REST_FRAMEWORK = {
+    # orjson when installed, otherwise the stdlib renderer
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# point CACHE_BACKEND/CACHE_LOCATION at a shared cache (e.g. a local redis) to share it between workers
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# cache used for per user list responses of the recipe app, and the generations their etags come from.
+# it has to be shared between workers, which `check --deploy` enforces (core.E002)
+RECIPE_CACHE_ALIAS = 'default'
+RECIPE_CACHE_TIMEOUT = 60 * 5
+
+# build recipe/tag/ingredient list responses from .values() rows instead of model instances
+# and serializer fields, see recipe.readers
+FAST_LIST_SERIALIZERS = True
+# unpaginated lists requested with ?stream=true are sent as they are read, in chunks of this many rows
+LIST_STREAM_CHUNK_SIZE = 2000
+
+# rows per cursor read of recipe exports and per transaction of imports, see recipe.transfer
+RECIPE_TRANSFER_CHUNK_SIZE = 2000
+RECIPE_IMPORT_MAX_ERRORS = 100
+
+# sorted name indexes kept in process for tag/ingredient suggestions, users with more names
+# than SUGGEST_CACHE_MAX_NAMES are answered from the database, where pg_trgm can't narrow one or
+# two character prefixes. a process holds at most MAX_USERS indexes and MAX_TOTAL_NAMES names
+# (roughly 25MB at 1M), least recently used first out. each change of a user's names re-reads
+# up to MAX_NAMES + 1 rows, see bench_suggest for the timings at 20k names
+SUGGEST_CACHE_MAX_USERS = 200
+SUGGEST_CACHE_MAX_NAMES = 20000
+SUGGEST_CACHE_MAX_TOTAL_NAMES = 1000000
+
+# threads (each with its own database connection) running the queries of the async views
+# ASGI workers serve, see core.async_views. 0 runs them on django's single thread sensitive thread
+ASYNC_DB_WORKERS = int(os.environ.get('ASYNC_DB_WORKERS', 16))
+# streamed bodies are read on threads of their own, each holding its connection until the client
+# has the whole body. at most this many are streamed at once, responses waiting longer get a 503
+ASYNC_DB_STREAM_WORKERS = int(os.environ.get('ASYNC_DB_STREAM_WORKERS', 32))
+ASYNC_DB_STREAM_QUEUE_TIMEOUT = 5
+
+# token -> user memoization of user.authentication.CachedTokenAuthentication. with a shared cache,
+# the in-process tier checks each hit against the token's version there, so revoked tokens, changed
+# passwords and deactivated users are rejected by every worker at once. without one, other workers
+# can't invalidate it, and a revoked token keeps working on them for up to TOKEN_AUTH_CACHE_TTL seconds
+TOKEN_AUTH_CACHE_TTL = 5
+TOKEN_AUTH_CACHE_MAX_SIZE = 10000
+TOKEN_AUTH_SHARED_CACHE_ALIAS = None
+TOKEN_AUTH_SHARED_CACHE_TTL = 60 * 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
 PASSWORD_HASHERS = [
-    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'core.hashers.Argon2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
     'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
 ]
+
+# argon2 costs can be tuned per environment, existing hashes are upgraded on login
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 102400))
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 8))
+
+# hashes run on a bounded thread pool, requests waiting longer than the timeout get a 503
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 0)) or None
+PASSWORD_HASHING_QUEUE_SIZE = 16
+PASSWORD_HASHING_QUEUE_TIMEOUT = 5
 # from django.contrib.auth.password_validation import
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -142,6 +237,22 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# recipe image uploads are streamed to disk in chunks and rejected past these limits
+RECIPE_IMAGE_MAX_BYTES = 25 * 1024 * 1024
+RECIPE_IMAGE_MAX_PIXELS = 64 * 1000 * 1000
+RECIPE_IMAGE_UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# image blobs are shared by content, unreferenced ones younger than this are left to gc_recipe_images
+IMAGE_BLOB_GRACE_SECONDS = 60 * 10
+
+# resized copies of recipe images, generated in the background after uploads
+IMAGE_VARIANT_SIZES = 128, 512, 1024
+IMAGE_VARIANT_FORMAT = 'WEBP'
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_WORKERS = 2
+# images whose variants are known to exist, remembered per process so reads don't check storage
+IMAGE_VARIANT_CACHE_SIZE = 100000
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,169 @@
+import copy
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+SHARED_KEY = 'auth-token:{digest}'
+VERSION_KEY = 'auth-token-version:{digest}'
+
+
+def token_digest(key):
+    """tokens are credentials, so only their digest is used in cache keys"""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class TokenCacheStats:
+    """hit and miss counters of the token cache tiers"""
+
+    def __init__(self):
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def hit_ratio(self):
+        hits = self.local_hits + self.shared_hits
+        total = hits + self.misses
+        return hits / total if total else 0.0
+
+    def reset(self):
+        self.__init__()
+
+
+class LocalTokenCache:
+    """bounded in-process LRU of token digest -> (expiry, user, token, version)"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return entry[1:]
+
+    def set(self, digest, user, token, version=None):
+        ttl = settings.TOKEN_AUTH_CACHE_TTL
+        if not ttl:
+            return
+        with self._lock:
+            self._entries[digest] = (time.monotonic() + ttl, user, token, version)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > settings.TOKEN_AUTH_CACHE_MAX_SIZE:
+                self._entries.popitem(last=False)
+
+    def delete(self, digest):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalTokenCache()
+stats = TokenCacheStats()
+
+
+def get_shared_cache():
+    alias = settings.TOKEN_AUTH_SHARED_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def token_version(shared_cache, digest):
+    """
+    the version of a token in the shared cache, which changes whenever the token is invalidated.
+    read before the token's user, so an invalidation in between isn't missed
+    """
+    key = VERSION_KEY.format(digest=digest)
+    # an evicted version comes back as a new one, never as the one entries were cached with
+    shared_cache.add(key, uuid.uuid4().hex, timeout=None)
+    return shared_cache.get(key)
+
+
+def invalidate_tokens(*keys):
+    """
+    drop tokens from both tiers, e.g. after the token or its user changed. other workers find out
+    through the token's version, which their in-process tier checks on every hit
+    """
+    shared_cache = get_shared_cache()
+    for key in keys:
+        digest = token_digest(key)
+        local_cache.delete(digest)
+        if shared_cache is not None:
+            shared_cache.delete(SHARED_KEY.format(digest=digest))
+            shared_cache.set(VERSION_KEY.format(digest=digest), uuid.uuid4().hex, timeout=None)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    token authentication which memoizes token -> user, first in process then in the
+    optional shared cache, before falling back to the token/user query. with a shared cache, hits
+    of the in-process tier are checked against the token's version there, so a token revoked by
+    another worker stops working at once. without one, it works for up to TOKEN_AUTH_CACHE_TTL
+    """
+
+    def _local_credentials(self, digest, shared_cache=None):
+        cached = local_cache.get(digest)
+        if cached is None:
+            return None
+        user, token, version = cached
+        if shared_cache is not None and shared_cache.get(VERSION_KEY.format(digest=digest)) != version:
+            local_cache.delete(digest)
+            return None
+        stats.local_hits += 1
+        return copy.copy(user), token
+
+    def authenticate_in_process(self, request):
+        """
+        the (user, token) of the request when its token is in the in-process tier, found without
+        any I/O so async views can authenticate in the event loop. None when authenticate() has to run,
+        which is always with a shared cache, as checking the token's version there is I/O
+        """
+        if get_shared_cache() is not None:
+            return None
+        auth = get_authorization_header(request).split()
+        if len(auth) != 2 or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            return None
+        return self._local_credentials(token_digest(key))
+
+    def authenticate_credentials(self, key):
+        digest = token_digest(key)
+        shared_cache = get_shared_cache()
+        credentials = self._local_credentials(digest, shared_cache)
+        if credentials is not None:
+            return credentials
+
+        version = None
+        if shared_cache is not None:
+            version = token_version(shared_cache, digest)
+            cached = shared_cache.get(SHARED_KEY.format(digest=digest))
+            if cached is not None:
+                stats.shared_hits += 1
+                local_cache.set(digest, *cached, version)
+                return copy.copy(cached[0]), cached[1]
+
+        stats.misses += 1
+        user, token = super().authenticate_credentials(key)
+        local_cache.set(digest, user, token, version)
+        if shared_cache is not None:
+            shared_cache.set(
+                SHARED_KEY.format(digest=digest), (user, token), timeout=settings.TOKEN_AUTH_SHARED_CACHE_TTL
+            )
+        return copy.copy(user), token
@@ -1,11 +1,20 @@
-from rest_framework import serializers
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
 from django.contrib.auth import get_user_model, authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.utils.translation import gettext_lazy as _
 
+from core.hashers import PasswordHashingBusy
+
 User = get_user_model()
 
 
+class PasswordHashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many concurrent sign ins, try again shortly')
+    default_code = 'password_hashing_busy'
+
+
 class UserSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -32,12 +41,18 @@ class UserSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-        return User.objects.create_user(**validated_data)
+        try:
+            return User.objects.create_user(**validated_data)
+        except PasswordHashingBusy:
+            raise PasswordHashingUnavailable()
 
     def update(self, instance, validated_data):
         password = validated_data.pop('password', None)
         if password:
-            instance.set_password(password)
+            try:
+                instance.set_password(password)
+            except PasswordHashingBusy:
+                raise PasswordHashingUnavailable()
         return super().update(instance, validated_data)
 
 
@@ -51,7 +66,10 @@ class AuthTokenSerializer(serializers.Serializer):
         email = attrs.get('email')
         password = attrs.get('password')
 
-        user = authenticate(request=self.context.get('request'), email=email, password=password)
+        try:
+            user = authenticate(request=self.context.get('request'), email=email, password=password)
+        except PasswordHashingBusy:
+            raise PasswordHashingUnavailable()
         if not user:
             msg = _('Unable to authenticate with provided credentials')
             raise serializers.ValidationError(msg, code='authentication')
@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from user.authentication import CachedTokenAuthentication, local_cache, stats, token_digest
+
+User = get_user_model()
+me_url = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    """token -> user lookups are memoized and invalidated on changes"""
+    def setUp(self) -> None:
+        local_cache.clear()
+        cache.clear()
+        stats.reset()
+        self.user = User.objects.create_user(email='hiwa@gmail.com', password='hiwa_asdf')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeated_requests_skip_token_query(self):
+        self.client.get(me_url)
+        with self.assertNumQueries(0):
+            response = self.client.get(me_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(stats.misses, 1)
+        self.assertEqual(stats.local_hits, 1)
+        self.assertEqual(stats.hit_ratio, 0.5)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get(me_url)
+        self.token.delete()
+        response = self.client.get(me_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(me_url)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(me_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates_cached_user(self):
+        self.client.get(me_url)
+        self.client.patch(me_url, {'password': 'a new password'})
+        self.client.get(me_url)
+        self.assertEqual(stats.misses, 2)
+
+    @override_settings(TOKEN_AUTH_CACHE_TTL=0, TOKEN_AUTH_SHARED_CACHE_ALIAS='default')
+    def test_shared_cache_tier(self):
+        self.client.get(me_url)
+        with self.assertNumQueries(0):
+            self.client.get(me_url)
+        self.assertEqual(stats.shared_hits, 1)
+        self.token.delete()
+        response = self.client.get(me_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_SHARED_CACHE_ALIAS='default')
+    def test_token_revoked_by_another_worker_is_rejected(self):
+        self.client.get(me_url)
+        with self.assertNumQueries(0):
+            self.client.get(me_url)
+        self.assertEqual(stats.local_hits, 1)
+        # the in-process tier of another worker, which the revocation didn't reach
+        digest = token_digest(self.token.key)
+        stale = local_cache.get(digest)
+        self.token.delete()
+        local_cache.set(digest, *stale)
+        response = self.client.get(me_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(stats.local_hits, 1)
+
+    @override_settings(TOKEN_AUTH_SHARED_CACHE_ALIAS='default')
+    def test_no_in_process_authentication_with_shared_cache(self):
+        self.client.get(me_url)
+        request = self.client.get(me_url).wsgi_request
+        self.assertIsNone(CachedTokenAuthentication().authenticate_in_process(request))
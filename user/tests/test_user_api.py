@@ -3,6 +3,10 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.test import TestCase
+from unittest.mock import patch
+
+from core.hashers import PasswordHashingBusy
+
 User = get_user_model()
 
 create_url = reverse('user:create')
@@ -91,6 +95,12 @@ class AnonymousUserApiTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertNotIn('token', response.data)
 
+    @patch('core.hashers.hashing_pool.run', side_effect=PasswordHashingBusy)
+    def test_create_token_while_hashing_busy(self, run):
+        """logins are shed with 503 when every hashing slot is taken"""
+        response = self.client.post(token_url, {'email': 'hiwa@gmail.com', 'password': 'hiwa_asdf'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
     def test_accessing_me_url(self):
         """as an Anonymous user we shouldn't be allowed to access this endpoint"""
         response = self.client.get(me_url)
@@ -130,3 +140,15 @@ class PrivateApiTest(APITestCase):
         self.user.refresh_from_db()
         self.assertEqual(self.user.name, data['name'])
         self.assertTrue(self.user.check_password(data['password']))
+
+    def test_me_url_conditional_get(self):
+        """unchanged profiles are answered with 304 until they are updated"""
+        response = self.client.get(me_url)
+        etag = response['ETag']
+        response = self.client.get(me_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(me_url, {'name': 'new name'})
+        response = self.client.get(me_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'new name')
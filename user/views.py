@@ -1,31 +1,104 @@
+import hashlib
+import json
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
-from rest_framework import generics, authentication
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework import generics
 from rest_framework.authtoken.views import ObtainAuthToken
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.settings import api_settings
 from rest_framework.permissions import IsAuthenticated
 
+from core.async_views import database_sync_to_async
+from core.hashers import PasswordHashingBusy, prehash, prehashed_passwords
+from .authentication import CachedTokenAuthentication
 from .serializers import UserSerializer, AuthTokenSerializer
 
 User = get_user_model()
 
 
+def user_etag(request, *args, **kwargs):
+    """strong etag from the user's version stamp"""
+    user = request.user
+    value = f'{user.pk}:{user.updated_at.isoformat()}:{request.META.get("HTTP_ACCEPT", "")}'
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def user_last_modified(request, *args, **kwargs):
+    """http dates only have second precision, so a change within the last second isn't advertised"""
+    updated_at = request.user.updated_at
+    if timezone.now() - updated_at < timedelta(seconds=1):
+        return None
+    return updated_at
+
+
+def posted_credentials(request):
+    """email and password of a json or form body, read ahead of the view, which parses it again"""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return None, None
+        if not isinstance(data, dict):
+            return None, None
+    else:
+        data = request.POST
+    email, password = data.get('email'), data.get('password')
+    return email if isinstance(email, str) else None, password if isinstance(password, str) else None
+
+
+def password_hash(email):
+    return User._default_manager.filter(email=email).values_list('password', flat=True).first()
+
+
+@asynccontextmanager
+async def prehashed(request, login):
+    """
+    under ASGI the password is hashed (for a login, verified) awaiting the hashing pool in the
+    event loop, before the sync view runs on a database thread, see core.async_views.async_view
+    """
+    with prehashed_passwords():
+        email, password = posted_credentials(request)
+        if password and (email or not login):
+            try:
+                await prehash(password, await database_sync_to_async(password_hash)(email) if login else None)
+            except PasswordHashingBusy:
+                # the view hashes itself, and answers with a 503 if the pool is still busy
+                pass
+        yield
+
+
 class CreateUserView(generics.CreateAPIView):
     """handles creating new users"""
     serializer_class = UserSerializer
 
+    @staticmethod
+    def prepare_async(request):
+        return prehashed(request, login=False)
+
 
 class CreateTokenView(ObtainAuthToken):
     """Create new auth token for view"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    @staticmethod
+    def prepare_async(request):
+        return prehashed(request, login=True)
+
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """this class handle me_url and managing user info"""
     serializer_class = UserSerializer
-    authentication_classes = authentication.TokenAuthentication,
+    authentication_classes = CachedTokenAuthentication,
     permission_classes = IsAuthenticated,
 
     def get_object(self):
         return self.request.user
+
+    @method_decorator(condition(etag_func=user_etag, last_modified_func=user_last_modified))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)